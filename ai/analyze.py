@@ -1,21 +1,43 @@
 # ai/analyze.py
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Dict, List, Tuple, Optional
 import time
 from math import isnan
 
+import numpy as np
+
 from resources import read as db_read
 
+# Value spread below which a series counts as flat (no regression needed)
+FLAT_EPS = 1e-9
+
+# (sensor, column) pairs forecast by api_prediction, in response order
+FORECAST_FIELDS = (
+    ("dht11", "temperature_c"),
+    ("dht11", "humidity_percent"),
+    ("mq2", "voltage"),
+    ("mq2", "raw"),
+    ("mq135", "voltage"),
+    ("mq135", "raw"),
+    ("dsm501a", "concentration_ug_m3"),
+    ("dsm501a", "ratio"),
+)
+
+# Shared pool for the independent per-field forecasts, created once
+_POOL = ThreadPoolExecutor(max_workers=4)
 
-def _linear_regression(xs: List[float], ys: List[float]) -> Tuple[float, float]:
-    n = len(xs)
-    if n == 0:
+
+def _linear_regression(xs: np.ndarray, ys: np.ndarray) -> Tuple[float, float]:
+    if xs.size == 0:
         return 0.0, 0.0
-    mean_x = sum(xs) / n
-    mean_y = sum(ys) / n
-    num = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
-    den = sum((x - mean_x) ** 2 for x in xs) or 1.0
+    mean_x = xs.mean()
+    mean_y = ys.mean()
+    dx = xs - mean_x
+    num = float(np.dot(dx, ys - mean_y))
+    den = float(np.dot(dx, dx)) or 1.0
     a = num / den
-    b = mean_y - a * mean_x
+    b = float(mean_y) - a * float(mean_x)
     return a, b
 
 
@@ -24,6 +46,7 @@ def _forecast_series(
     value_key: str,
     horizon_sec: int,
     min_points: int = 60,
+    now: Optional[int] = None,
 ) -> Dict[str, Optional[float]]:
     """
     Generic forecast helper.
@@ -32,6 +55,7 @@ def _forecast_series(
     value_key: which column to forecast
     horizon_sec: how far into the future to predict
     min_points: minimum points required to use regression
+    now: unix time the horizon counts from, defaults to the current time
     """
     rows = [r for r in rows if r.get(value_key) is not None]
     if not rows:
@@ -40,20 +64,23 @@ def _forecast_series(
             "predicted": None,
         }
 
-    xs = [float(r["ts"]) for r in rows]
-    ys = [float(r[value_key]) for r in rows]
+    n = len(rows)
+    xs = np.fromiter((r["ts"] for r in rows), dtype=np.float64, count=n)
+    ys = np.fromiter((r[value_key] for r in rows), dtype=np.float64, count=n)
 
-    latest_value = ys[-1]
+    latest_value = float(ys[-1])
 
-    if len(xs) < min_points:
-        # Not enough history, just use last value
+    if n < min_points or np.ptp(ys) < FLAT_EPS:
+        # Not enough history or a flat signal, just use last value
         return {
             "latest": latest_value,
             "predicted": latest_value,
         }
 
     a, b = _linear_regression(xs, ys)
-    target_ts = int(time.time()) + horizon_sec
+    if now is None:
+        now = int(time.time())
+    target_ts = now + horizon_sec
     y_pred = a * target_ts + b
 
     if isnan(y_pred):
@@ -65,6 +92,7 @@ def _forecast_series(
     }
 
 
+@lru_cache(maxsize=None)
 def _choose_history_window(horizon_sec: int) -> int:
     """
     Decide how far back to look based on requested horizon.
@@ -92,35 +120,27 @@ def api_prediction(horizon_sec: int = 300) -> Dict[str, Dict]:
         7200 - 2 hours ahead, etc.
     """
     history_window = _choose_history_window(horizon_sec)
+    # One clock read for the whole response, every field shares it
+    now = int(time.time())
+
+    # Fetch recent history from DB, all tables in one go. Dashboard polls
+    # a few seconds apart share the same read.
+    recent = db_read.recent_all_cached(min_seconds_back=history_window)
 
-    # Fetch recent history from DB
-    dht_rows = db_read.recent_dht11(min_seconds_back=history_window)
-    mq2_rows = db_read.recent_mq2(min_seconds_back=history_window)
-    mq135_rows = db_read.recent_mq135(min_seconds_back=history_window)
-    dsm_rows = db_read.recent_dsm501a(min_seconds_back=history_window)
+    # Every field is forecast independently, NumPy releases the GIL
+    tasks = {
+        (sensor, field): _POOL.submit(_forecast_series, recent[sensor], field, horizon_sec, now=now)
+        for sensor, field in FORECAST_FIELDS
+    }
 
-    result = {
+    result: Dict[str, Dict] = {
         "meta": {
             "horizon_sec": horizon_sec,
             "history_window_sec": history_window,
-            "ts_now": int(time.time()),
-        },
-        "dht11": {
-            "temperature_c": _forecast_series(dht_rows, "temperature_c", horizon_sec),
-            "humidity_percent": _forecast_series(dht_rows, "humidity_percent", horizon_sec),
-        },
-        "mq2": {
-            "voltage": _forecast_series(mq2_rows, "voltage", horizon_sec),
-            "raw": _forecast_series(mq2_rows, "raw", horizon_sec),
-        },
-        "mq135": {
-            "voltage": _forecast_series(mq135_rows, "voltage", horizon_sec),
-            "raw": _forecast_series(mq135_rows, "raw", horizon_sec),
-        },
-        "dsm501a": {
-            "concentration_ug_m3": _forecast_series(dsm_rows, "concentration_ug_m3", horizon_sec),
-            "ratio": _forecast_series(dsm_rows, "ratio", horizon_sec),
+            "ts_now": now,
         },
     }
+    for (sensor, field), future in tasks.items():
+        result.setdefault(sensor, {})[field] = future.result()
 
     return result
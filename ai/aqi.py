@@ -1,8 +1,11 @@
 # ai/aqi.py
 from __future__ import annotations
-from typing import Dict, Any, List
+from bisect import bisect_left
+from typing import Dict, Any, List, Tuple
 import time
 
+import numpy as np
+
 from sensors import dht11, dsm501a, mq2, mq135
 
 # ai/aqi.py
@@ -11,14 +14,30 @@ INDOOR_PM_CALIBRATION = 0.5
 
 # ---------- Helpers for live metrics ----------
 
-def _scaled_index(value: float, good_level: float, bad_level: float) -> float:
-    if value is None:
-        return 0.0
-    if value <= good_level:
-        return 0.0
-    if value >= bad_level:
-        return 500.0
-    return 500.0 * (value - good_level) / (bad_level - good_level)
+def _make_scaled_index(good_level: float, bad_level: float):
+    """
+    Build an index function mapping [good_level, bad_level] to [0, 500].
+
+    The thresholds never change at runtime, so the scale factor is
+    computed once here instead of on every reading. The returned function
+    expects a float; map missing readings to 0.0 before calling it.
+    """
+    inv_range = 500.0 / (bad_level - good_level)
+
+    def scaled_index(value: float) -> float:
+        if value <= good_level:
+            return 0.0
+        if value >= bad_level:
+            return 500.0
+        return (value - good_level) * inv_range
+
+    return scaled_index
+
+
+VOC_IDX = _make_scaled_index(0.3, 2.5)
+TOX_IDX = _make_scaled_index(0.6, 3.0)
+SMOKE_IDX = _make_scaled_index(0.3, 2.5)
+FLAME_IDX = _make_scaled_index(0.5, 3.0)
 
 
 PM25_BREAKPOINTS = [
@@ -48,23 +67,94 @@ PM10_BREAKPOINTS = [
     (425.0, 604.0, 301, 500),
 ]
 
-INDOOR_PM10_BREAKPOINTS = [
-    (0.0,   24.0,   0,   50),
-    (24.1,  70.8,  51,  100),
-    (70.9, 110.8, 101,  150),
-    (110.9,300.8, 151, 200),
-    (300.9,500.8, 201, 300),
-    (500.9,1000.8,301, 500),
-]
+# Indoor PM10 uses the same bands as indoor PM2.5; share the one table.
+INDOOR_PM10_BREAKPOINTS = INDOOR_PM25_BREAKPOINTS
+
+
+def _bisect_table(breakpoints) -> Tuple[List[float], Tuple[tuple, ...]]:
+    """(c_high list, rows) of a breakpoint table, for _aqi_from_pm."""
+    return [row[1] for row in breakpoints], tuple(breakpoints)
+
+
+PM25_LOOKUP = _bisect_table(PM25_BREAKPOINTS)
+INDOOR_PM25_LOOKUP = _bisect_table(INDOOR_PM25_BREAKPOINTS)
+PM10_LOOKUP = _bisect_table(PM10_BREAKPOINTS)
+INDOOR_PM10_LOOKUP = INDOOR_PM25_LOOKUP
 
 
-def _aqi_from_pm(value: float, breakpoints) -> float:
+def _aqi_from_pm(value: float, lookup) -> float:
+    """
+    Convert μg/m3 to AQI with a table from _bisect_table.
+
+    The band is found by binary search on c_high, the same rule as
+    _aqi_from_pm_vec, so values above the last breakpoint clamp to 500.
+    """
     if value is None:
         return 0.0
-    for c_low, c_high, i_low, i_high in breakpoints:
-        if c_low <= value <= c_high:
-            return i_low + (i_high - i_low) * (value - c_low) / (c_high - c_low)
-    return 500.0
+    highs, rows = lookup
+    i = bisect_left(highs, value)
+    if i >= len(rows):
+        return 500.0
+    c_low, c_high, i_low, i_high = rows[i]
+    return i_low + (i_high - i_low) * (value - c_low) / (c_high - c_low)
+
+
+# ---------- Vectorized breakpoint lookup (used for history) ----------
+
+def _breakpoint_arrays(breakpoints) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Split a breakpoint table into (c_low, c_high, i_low, i_high) arrays."""
+    table = np.asarray(breakpoints, dtype=np.float64)
+    return table[:, 0].copy(), table[:, 1].copy(), table[:, 2].copy(), table[:, 3].copy()
+
+
+PM25_ARRAYS = _breakpoint_arrays(PM25_BREAKPOINTS)
+INDOOR_PM25_ARRAYS = _breakpoint_arrays(INDOOR_PM25_BREAKPOINTS)
+PM10_ARRAYS = _breakpoint_arrays(PM10_BREAKPOINTS)
+INDOOR_PM10_ARRAYS = INDOOR_PM25_ARRAYS
+
+
+def _aqi_from_pm_vec(
+    values: np.ndarray,
+    c_low: np.ndarray,
+    c_high: np.ndarray,
+    i_low: np.ndarray,
+    i_high: np.ndarray,
+) -> np.ndarray:
+    """
+    Same mapping as _aqi_from_pm, applied to a whole array at once.
+
+    The row is picked with a binary search on c_high, so values above the
+    last breakpoint clamp to 500.
+    """
+    idx = np.searchsorted(c_high, values)
+    over = idx >= c_high.size
+    idx = np.minimum(idx, c_high.size - 1)
+    aqi = i_low[idx] + (i_high[idx] - i_low[idx]) * (values - c_low[idx]) / (c_high[idx] - c_low[idx])
+    return np.where(over, 500.0, aqi)
+
+
+# ---------- Status classification ----------
+
+# Upper AQI bound of each status band; anything above the last is Hazardous
+STATUS_BINS = np.array([50, 100, 150, 200, 300], dtype=np.float64)
+STATUS_LABELS = np.array([
+    "Good",
+    "Moderate",
+    "Unhealthy Sensitive",
+    "Unhealthy",
+    "Very Unhealthy",
+    "Hazardous",
+])
+
+
+def status_of(aqi: float) -> str:
+    """Human readable status for one AQI value."""
+    return str(STATUS_LABELS[int(np.searchsorted(STATUS_BINS, aqi))])
+
+
+def status_of_vec(aqi: np.ndarray) -> np.ndarray:
+    """Status label for every AQI value in the array."""
+    return STATUS_LABELS[np.searchsorted(STATUS_BINS, aqi)]
 
 
 def compute_current_metrics() -> Dict[str, Any]:
@@ -94,29 +184,19 @@ def compute_current_metrics() -> Dict[str, Any]:
 
     mq2_voltage = mq2_r.get("voltage")
     mq135_voltage = mq135_r.get("voltage")
+    mq2_voltage = 0.0 if mq2_voltage is None else mq2_voltage
+    mq135_voltage = 0.0 if mq135_voltage is None else mq135_voltage
 
-    voc_index = _scaled_index(mq135_voltage or 0.0, good_level=0.3, bad_level=2.5)
-    toxic_index = _scaled_index(mq135_voltage or 0.0, good_level=0.6, bad_level=3.0)
-    smoke_index = _scaled_index(mq2_voltage or 0.0, good_level=0.3, bad_level=2.5)
-    flame_index = _scaled_index(mq2_voltage or 0.0, good_level=0.5, bad_level=3.0)
+    voc_index = VOC_IDX(mq135_voltage)
+    toxic_index = TOX_IDX(mq135_voltage)
+    smoke_index = SMOKE_IDX(mq2_voltage)
+    flame_index = FLAME_IDX(mq2_voltage)
 
-    pm25_aqi = _aqi_from_pm(pm2_5 or 0.0, INDOOR_PM25_BREAKPOINTS )
-    pm10_aqi = _aqi_from_pm(pm10 or 0.0, INDOOR_PM10_BREAKPOINTS )
+    pm25_aqi = _aqi_from_pm(pm2_5 or 0.0, INDOOR_PM25_LOOKUP)
+    pm10_aqi = _aqi_from_pm(pm10 or 0.0, INDOOR_PM10_LOOKUP)
 
     combined_aqi = max(pm25_aqi, pm10_aqi)
-
-    if combined_aqi <= 50:
-        status = "Good"
-    elif combined_aqi <= 100:
-        status = "Moderate"
-    elif combined_aqi <= 150:
-        status = "Unhealthy Sensitive"
-    elif combined_aqi <= 200:
-        status = "Unhealthy"
-    elif combined_aqi <= 300:
-        status = "Very Unhealthy"
-    else:
-        status = "Hazardous"
+    status = status_of(combined_aqi)
 
     return {
         "ts": ts_now,
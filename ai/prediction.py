@@ -1,7 +1,19 @@
 from __future__ import annotations
+from collections import deque
+from functools import lru_cache
 from typing import Dict, Any, List, Tuple
 import math
-import warnings
+import time
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional, the kernels then run as plain NumPy
+    def njit(*args, **kwargs):
+        def wrap(fn):
+            return fn
+        return wrap
 
 from resources import read as read_db
 from resources import settings as settings_store
@@ -14,38 +26,128 @@ INDOOR_PM_CALIBRATION = getattr(aqi_module, "INDOOR_PM_CALIBRATION", 1.0)
 PM25_BPS = getattr(aqi_module, "INDOOR_PM25_BREAKPOINTS", aqi_module.PM25_BREAKPOINTS)
 PM10_BPS = getattr(aqi_module, "INDOOR_PM10_BREAKPOINTS", aqi_module.PM10_BREAKPOINTS)
 
+# Column arrays of the tables above for the vectorized lookup
+PM25_BP_ARRAYS = aqi_module._breakpoint_arrays(PM25_BPS)
+PM10_BP_ARRAYS = aqi_module._breakpoint_arrays(PM10_BPS)
+
+# PM10 is approximated from PM2.5, same as live AQI
+PM10_FROM_PM25 = 1.2
+
+# Since PM10 is a fixed multiple of PM2.5, max(PM2.5 AQI, PM10 AQI) only
+# depends on PM2.5. Tabulate it once at 0.1 ug/m3 steps: error is about
+# 0.1 AQI, up to 1 right at a band edge where the index steps by one.
+# Past 1000 ug/m3 both tables are already clamped at 500.
+PM_LUT_STEPS_PER_UG = 10
+PM_LUT_MAX_UG = 1000
+_PM_GRID = np.arange(PM_LUT_MAX_UG * PM_LUT_STEPS_PER_UG + 1) / PM_LUT_STEPS_PER_UG
+_PM_TO_AQI_TABLE = np.maximum(
+    aqi_module._aqi_from_pm_vec(_PM_GRID, *PM25_BP_ARRAYS),
+    aqi_module._aqi_from_pm_vec(_PM_GRID * PM10_FROM_PM25, *PM10_BP_ARRAYS),
+)
+
+# AQI spread below which the history counts as flat (no regression needed)
+FLAT_EPS = 1e-9
+
+# Seconds a cached forecast stays valid when refresh_rate is not set
+FORECAST_CACHE_TTL = 5
+
+# Rows parsed per chunk when scanning the Predictor CSV log
+HISTORY_CHUNK_ROWS = 50_000
+
+# Smoothing factor for the one-step-ahead sensor forecast
+SES_THETA = 0.3
+
+
+@njit(cache=True, fastmath=True)
+def _ses(y, theta):
+    """Simple exponential smoothing, returns the next-step forecast."""
+    x = y[0]
+    for i in range(1, y.size):
+        x = (1.0 - theta) * x + theta * y[i]
+    return x
+
+
+# Compile once at import, like _regress_and_forecast below
+_ses(np.arange(3.0), SES_THETA)
+
 
 class Predictor:
     def __init__(self, db_path: str) -> None:
         self.db_path = db_path
 
-    def load_sensor_history(self, sensor_name: str, limit: int = 200):
-        import pandas as pd
+    def load_sensor_history(self, sensor_name: str, limit: int = 200) -> np.ndarray:
+        """
+        Last `limit` values logged for sensor_name, oldest first.
 
-        df = pd.read_csv(self.db_path)
-        df = df[df["sensor"] == sensor_name].tail(limit)
-        return df["value"].astype(float)
+        The CSV is scanned in chunks with only the two needed columns, and
+        only the running tail is kept, so memory stays O(limit) no matter
+        how large the log grows.
+        """
+        import pandas as pd
 
-    def predict_next_5min(self, sensor_name: str) -> float | None:
-        from statsmodels.tsa.arima.model import ARIMA
+        tail: deque = deque(maxlen=limit)
+        for chunk in pd.read_csv(
+            self.db_path,
+            usecols=["sensor", "value"],
+            dtype={"value": "float64"},
+            engine="c",
+            chunksize=HISTORY_CHUNK_ROWS,
+        ):
+            values = chunk["value"].to_numpy()[(chunk["sensor"] == sensor_name).to_numpy()]
+            tail.extend(values[-limit:].tolist())
 
-        warnings.filterwarnings("ignore")
+        return np.fromiter(tail, dtype=np.float64, count=len(tail))
 
+    def predict_next_5min(self, sensor_name: str) -> float | None:
         values = self.load_sensor_history(sensor_name)
 
         if len(values) < 10:
             return None
 
-        model = ARIMA(values, order=(3, 1, 2))
-        model_fit = model.fit()
-
-        forecast = model_fit.forecast(steps=1)
-        return float(forecast[0])
+        # One pass of exponential smoothing instead of fitting an ARIMA
+        # model on every call
+        return float(_ses(values, SES_THETA))
 
 
 # ---------- AQI forecast helpers (moved from ai/aqi.py) ----------
 
-def _history_points(max_minutes: int) -> List[Dict[str, Any]]:
+@njit(cache=True, fastmath=True)
+def _regress_and_forecast(xs0, ys, future_x):
+    """
+    Least squares fit of ys on xs0, residual errors, and the clamped
+    0..500 forecast at future_x. Returns (a, b, mae, rmse, y_future).
+
+    Everything runs in float64: the fit to avoid cancellation in
+    n*sxx - sx*sx, the forecast so the JSON carries no float32 noise.
+    """
+    n = xs0.size
+    sx = xs0.sum()
+    sy = ys.sum()
+    sxx = (xs0 * xs0).sum()
+    sxy = (xs0 * ys).sum()
+    denom = n * sxx - sx * sx
+    a = (n * sxy - sx * sy) / denom
+    b = (sy - a * sx) / n
+    res = ys - (a * xs0 + b)
+    mae = np.abs(res).mean()
+    rmse = np.sqrt((res * res).mean())
+    y = a * future_x + b
+    for i in range(y.size):
+        if y[i] < 0.0:
+            y[i] = 0.0
+        elif y[i] > 500.0:
+            y[i] = 500.0
+    return a, b, mae, rmse, y
+
+
+# Compile once at import so the first forecast request does not pay for it
+_regress_and_forecast(np.arange(3.0), np.arange(3.0), np.arange(1.0, 3.0))
+
+
+def _history_points(max_minutes: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    PM driven AQI history as two parallel arrays: ts (int64) and aqi (float64).
+    """
     lookback_seconds = max(600, max_minutes * 60 * 2)
 
     rows = read_db.recent_dsm501a(
@@ -53,38 +155,36 @@ def _history_points(max_minutes: int) -> List[Dict[str, Any]]:
         max_rows=2000,
     )
 
-    points: List[Dict[str, Any]] = []
-    for r in rows:
-        ts = int(r.get("ts") or 0)
-        pm2_5_raw = r.get("concentration_ug_m3")
-        if pm2_5_raw is None:
-            continue
-
-        # Apply the same indoor calibration as live AQI
-        pm2_5 = pm2_5_raw * INDOOR_PM_CALIBRATION
-        pm10 = pm2_5 * 1.2
-
-        # Use the same breakpoint sets used by ai/aqi.py
-        pm25_aqi = aqi_module._aqi_from_pm(pm2_5, PM25_BPS)
-        pm10_aqi = aqi_module._aqi_from_pm(pm10, PM10_BPS)
+    rows = [r for r in rows if r.get("concentration_ug_m3") is not None]
+    n = len(rows)
 
-        # For forecast we only care about PM driven AQI
-        aqi_val = max(pm25_aqi, pm10_aqi)
+    ts = np.fromiter((r.get("ts") or 0 for r in rows), dtype=np.int64, count=n)
+    pm2_5_raw = np.fromiter(
+        (r["concentration_ug_m3"] for r in rows), dtype=np.float64, count=n
+    )
 
-        points.append({"ts": ts, "aqi": float(aqi_val)})
+    # Apply the same indoor calibration as live AQI
+    pm2_5 = pm2_5_raw * INDOOR_PM_CALIBRATION
 
-    return points
+    # For forecast we only care about PM driven AQI: one gather from the
+    # precomputed max(PM2.5, PM10) table built from the ai/aqi.py breakpoints
+    idx = np.clip(np.rint(pm2_5 * PM_LUT_STEPS_PER_UG), 0, _PM_GRID.size - 1).astype(np.intp)
+    aqi = _PM_TO_AQI_TABLE[idx]
 
+    return ts, aqi
 
 
 def _linear_forecast(
-    history: List[Dict[str, Any]],
+    ts: np.ndarray,
+    aqi: np.ndarray,
     horizon_minutes: int,
     step_seconds: int = 60,
 ) -> Tuple[List[Dict[str, Any]], float, float, float]:
     """
     Linear regression forecast on time vs AQI.
 
+    ts and aqi are the parallel history arrays from _history_points.
+
     Margin of error per forecast point is derived from the
     Root Mean Squared Error (RMSE) of the regression, scaled
     by the number of historical readings (N):
@@ -95,76 +195,97 @@ def _linear_forecast(
     grow when we have fewer samples.
 
     Returns:
-        forecast: list of {ts, aqi, error} for future times only
+        forecast: list of {ts, aqi, error, status} for future times only
         mae: mean absolute error on the history
         rmse: root mean squared error on the history
         margin: per point symmetric +/- AQI margin
     """
-    n_history = len(history)
+    n_history = ts.size
     if n_history < 3:
         return [], 0.0, 0.0, 0.0
 
-    xs = [p["ts"] for p in history]
-    ys = [p["aqi"] for p in history]
-
     # Center time to improve numeric stability
-    t0 = xs[0]
-    xs0 = [x - t0 for x in xs]
-    n = float(len(xs0))
+    t0 = int(ts[0])
+    xs0 = (ts - t0).astype(np.float64)
 
-    sum_x = sum(xs0)
-    sum_y = sum(ys)
-    sum_xx = sum(x * x for x in xs0)
-    sum_xy = sum(x * y for x, y in zip(xs0, ys))
-
-    denom = n * sum_xx - sum_x * sum_x
-    if denom == 0:
+    # Same timestamp everywhere means no slope can be fitted
+    if np.ptp(xs0) == 0:
         return [], 0.0, 0.0, 0.0
 
-    a = (n * sum_xy - sum_x * sum_y) / denom
-    b = (sum_y - a * sum_x) / n
-
-    # Compute residuals on history to estimate typical error
-    residuals = []
-    for ts, y in zip(xs, ys):
-        x0 = ts - t0
-        y_hat = a * x0 + b
-        residuals.append(y - y_hat)
+    last_ts = int(ts[-1])
+    steps = max(1, int(horizon_minutes * 60 / step_seconds))
+    ts_future = last_ts + np.arange(1, steps + 1, dtype=np.int64) * step_seconds
 
-    if residuals:
-        mae = sum(abs(r) for r in residuals) / len(residuals)
-        rmse = math.sqrt(sum(r * r for r in residuals) / len(residuals))
+    if np.ptp(aqi) < FLAT_EPS:
+        # Flat signal (common indoors): the fit is the constant itself,
+        # with zero residuals, so skip the regression entirely
+        y_future = np.full(steps, min(500.0, max(0.0, float(aqi[-1]))))
+        mae = rmse = margin = 0.0
     else:
-        mae = rmse = 0.0
+        a, b, mae, rmse, y_future = _regress_and_forecast(
+            xs0, aqi, (ts_future - t0).astype(np.float64)
+        )
 
-    # Margin of error shrinks as we get more history
-    if n_history > 0:
-        margin = rmse / math.sqrt(float(n_history))
-    else:
-        margin = rmse
+        # Margin of error shrinks as we get more history
+        margin = float(rmse) / math.sqrt(float(n_history))
 
-    last_ts = xs[-1]
-    steps = max(1, int(horizon_minutes * 60 / step_seconds))
+    statuses = aqi_module.status_of_vec(y_future)
 
-    forecast: List[Dict[str, Any]] = []
-    for i in range(1, steps + 1):
-        ts = last_ts + i * step_seconds
-        x = ts - t0
-        y = a * x + b
-        # Clamp to 0..500
-        y = max(0.0, min(500.0, y))
-        forecast.append(
-            {
-                "ts": ts,
-                "aqi": float(y),
-                # Frontend reads error as +/- AQI uncertainty
-                "error": float(margin),
-            }
-        )
+    forecast: List[Dict[str, Any]] = [
+        # Frontend reads error as +/- AQI uncertainty
+        {"ts": ts, "aqi": y, "error": margin, "status": status}
+        for ts, y, status in zip(ts_future.tolist(), y_future.tolist(), statuses.tolist())
+    ]
 
     return forecast, float(mae), float(rmse), float(margin)
 
 
+@lru_cache(maxsize=8)
+def _compute_aqi_forecast_cached(
+    horizon_minutes: int,
+    last_ts: int | None,
+    ttl: int,
+    bucket: int,
+) -> Dict[str, Any]:
+    """
+    Build the forecast payload for one horizon.
+
+    last_ts (newest DSM501A timestamp), ttl and bucket (wall time // ttl)
+    are only part of the cache key: a new sample or the next ttl bucket
+    gives a new entry, and each key expires on its own. The payload is
+    shared between callers, compute_aqi_forecast hands out copies.
+    """
+    ts, aqi = _history_points(horizon_minutes)
+    history_count = int(ts.size)
+    if history_count < 3:
+        return {
+            "ok": False,
+            "reason": "not_enough_history",
+            "history_count": history_count,
+            "forecast": [],
+        }
+
+    forecast, mae, rmse, margin = _linear_forecast(ts, aqi, horizon_minutes)
+
+    return {
+        "ok": True,
+        "horizon_minutes": horizon_minutes,
+        "history_count": history_count,
+        "forecast_count": len(forecast),
+        "mae": mae,
+        "rmse": rmse,
+        "margin_error": margin,
+        "margin_method": "rmse_over_sqrt_n",
+        # Frontend uses 'aqi' and 'error' per point
+        "forecast": forecast,
+    }
+
+
+def clear_forecast_cache() -> None:
+    """Drop cached forecasts, e.g. after the settings changed."""
+    _compute_aqi_forecast_cached.cache_clear()
+
+
 def compute_aqi_forecast() -> Dict[str, Any]:
     """
     Predictive AQI based on recent PM history.
@@ -177,6 +298,10 @@ def compute_aqi_forecast() -> Dict[str, Any]:
     "error" field representing a symmetric +/- AQI margin for that
     timestamp. The margin depends both on the regression error and
     on the number of available historical readings.
+
+    Results are cached per (horizon, newest DSM501A sample) and reused
+    for refresh_rate seconds, so dashboard polling between two samples
+    does not rerun the whole pipeline.
     """
     try:
         # 1) Forecast horizon from settings
@@ -185,34 +310,24 @@ def compute_aqi_forecast() -> Dict[str, Any]:
             horizon_minutes = int(settings["forecast_duration"])
         else:
             horizon_minutes = 60
+        if settings and settings.get("refresh_rate"):
+            ttl = max(1, int(settings["refresh_rate"]))
+        else:
+            ttl = FORECAST_CACHE_TTL
     except Exception:
         horizon_minutes = 60
+        ttl = FORECAST_CACHE_TTL
 
     try:
-        history = _history_points(horizon_minutes)
-        history_count = len(history)
-        if history_count < 3:
-            return {
-                "ok": False,
-                "reason": "not_enough_history",
-                "history_count": history_count,
-                "forecast": [],
-            }
-
-        forecast, mae, rmse, margin = _linear_forecast(history, horizon_minutes)
+        last_ts = read_db.latest_dsm501a_ts()
 
-        return {
-            "ok": True,
-            "horizon_minutes": horizon_minutes,
-            "history_count": history_count,
-            "forecast_count": len(forecast),
-            "mae": mae,
-            "rmse": rmse,
-            "margin_error": margin,
-            "margin_method": "rmse_over_sqrt_n",
-            # Frontend uses 'aqi' and 'error' per point
-            "forecast": forecast,
-        }
+        # History window slides with wall time, so entries also roll
+        # over every ttl seconds
+        bucket = int(time.time()) // ttl
+        result = _compute_aqi_forecast_cached(horizon_minutes, last_ts, ttl, bucket)
+
+        # Copy so callers can modify their payload without touching the cache
+        return dict(result, forecast=[dict(p) for p in result["forecast"]])
     except Exception as e:
         # Never throw to Flask, always return JSON
         return {
@@ -1,16 +1,23 @@
 #!/usr/bin/env python3
 from __future__ import annotations
+import logging
 import pathlib
 import sqlite3
+import threading
 import time
 import csv
 import io
 import xlsxwriter
-from flask import jsonify, Response
+from flask import Response
 
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, jsonify, request, stream_with_context
 from flask_cors import CORS
 
+try:
+    import orjson
+except ImportError:  # fall back to Flask's stdlib json encoder
+    orjson = None
+
 from sensors import dht11, mq2, mq135, dsm501a, live_aqi
 from resources import store, read as read_db
 from resources import settings as settings_store
@@ -19,6 +26,8 @@ from resources.email import ALERT_DB_PATH, _ensure_alert_log_table
 from resources.spike import Reading, handle_new_reading_for_dashboard
 import datetime as dt
 
+logger = logging.getLogger(__name__)
+
 # ---------- Paths ----------
 
 ROOT = pathlib.Path(__file__).resolve().parent
@@ -44,24 +53,67 @@ CTX = {
 
 # ---------- Flask ----------
 
-app = Flask(__name__)
-CORS(app)
+api = Blueprint("api", __name__)
+
 
-@app.before_first_request
 def init_db():
     store.ensure_tables()
     store.ensure_dashboard_table()
     settings_store.init_db()
 
+
+def create_app() -> Flask:
+    """
+    Build the Flask app. The databases are prepared here, once, before
+    any request is served (before_first_request is gone in Flask 2.3+).
+
+    Run with a threaded WSGI server, e.g.:
+        gunicorn -k gthread -w 2 --threads 8 -b 0.0.0.0:5000 wsgi:app
+    """
+    init_db()
+
+    app = Flask(__name__)
+    CORS(app)
+    app.register_blueprint(api)
+    return app
+
+# orjson handles numpy scalars from the AI code and writes bytes directly
+_ORJSON_OPTS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def _json(data, status: int = 200) -> Response:
+    if orjson is None:
+        resp = jsonify(data)
+        resp.status_code = status
+        return resp
+    return Response(
+        orjson.dumps(data, option=_ORJSON_OPTS),
+        status=status,
+        mimetype="application/json",
+    )
+
+
 # ---------- API ----------
 
-@app.get("/api/health")
+# Health probes get a prebuilt body, rebuilt at most once per second
+_HEALTH_BODY = b'{"ok":true,"time":%d}'
+_health_cache = {"sec": -1, "body": b""}
+_health_lock = threading.Lock()
+
+
+@api.get("/api/health")
 def api_health():
-    return jsonify({"ok": True, "time": int(time.time())})
+    now = int(time.time())
+    with _health_lock:
+        if _health_cache["sec"] != now:
+            _health_cache["sec"] = now
+            _health_cache["body"] = _HEALTH_BODY % now
+        body = _health_cache["body"]
+    return Response(body, mimetype="application/json")
 
 
 # Raw sensor endpoints (unchanged)
-@app.get("/api/dht11")
+@api.get("/api/dht11")
 def api_dht11():
     data = dht11.read()
     store.insert_dht11(
@@ -69,10 +121,10 @@ def api_dht11():
         humidity_percent=data.get("humidity_percent"),
         ts=data.get("ts"),
     )
-    return jsonify(data)
+    return _json(data)
 
 
-@app.get("/api/mq2")
+@api.get("/api/mq2")
 def api_mq2():
     data = mq2.read()
     store.insert_mq2(
@@ -80,10 +132,10 @@ def api_mq2():
         voltage=data.get("voltage"),
         ts=data.get("ts"),
     )
-    return jsonify(data)
+    return _json(data)
 
 
-@app.get("/api/mq135")
+@api.get("/api/mq135")
 def api_mq135():
     data = mq135.read()
     store.insert_mq135(
@@ -91,10 +143,10 @@ def api_mq135():
         voltage=data.get("voltage"),
         ts=data.get("ts"),
     )
-    return jsonify(data)
+    return _json(data)
 
 
-@app.get("/api/dsm501a")
+@api.get("/api/dsm501a")
 def api_dsm501a():
     data = dsm501a.read()
     store.insert_dsm501a(
@@ -103,90 +155,72 @@ def api_dsm501a():
         concentration_ug_m3=data.get("concentration_ug_m3"),
         ts=data.get("ts"),
     )
-    return jsonify(data)
+    return _json(data)
 
 
 # ---------- Single combined dashboard endpoint ----------
-@app.get("/api/dashboard")
-def api_dashboard():
-    # Compute live metrics (AQI, PM, indexes etc)
-    metrics = live_aqi.compute_live_metrics()
 
-    # Load refresh_rate from settings
-    settings = settings_store.get_latest_settings()
-    refresh_rate = 1
-    if settings and settings.get("refresh_rate"):
-        refresh_rate = max(1, int(settings["refresh_rate"]))  # enforce min 1 sec
+# Spike handler value key -> live metrics key (the keys are also the
+# dashboard_readings column names)
+SPIKE_METRIC_KEYS = (
+    ("aqi", "aqi"),
+    ("pm25", "pm2_5_ug_m3"),
+    ("pm10", "pm10_ug_m3"),
+    ("temp", "temperature_c"),
+    ("humidity", "humidity_percent"),
+    ("toxic", "toxic_index"),
+    ("flammable", "flammable_index"),
+    ("smoke", "smoke_index"),
+    ("voc", "voc_index"),
+)
+
+@api.get("/api/dashboard")
+def api_dashboard():
+    # Compute live metrics (AQI, PM, indexes etc), keeping the sensor
+    # readings they were computed from for logging
+    metrics = live_aqi.compute_live_metrics(include_raw=True)
+    raw = metrics.pop("raw")
 
     try:
-        # Read each sensor directly and log raw data
-        dht = dht11.read()
-        store.insert_dht11(
-            temperature_c=dht.get("temperature_c"),
-            humidity_percent=dht.get("humidity_percent"),
-            ts=dht.get("ts"),
-        )
-
-        mq2_r = mq2.read()
-        store.insert_mq2(
-            raw=mq2_r.get("raw"),
-            voltage=mq2_r.get("voltage"),
-            ts=mq2_r.get("ts"),
-        )
-
-        mq135_r = mq135.read()
-        store.insert_mq135(
-            raw=mq135_r.get("raw"),
-            voltage=mq135_r.get("voltage"),
-            ts=mq135_r.get("ts"),
-        )
-
-        dsm = dsm501a.read(sample_sec=refresh_rate)
-        store.insert_dsm501a(
-            low_pulse_ms=dsm.get("low_pulse_ms"),
-            ratio=dsm.get("ratio"),
-            concentration_ug_m3=dsm.get("concentration_ug_m3"),
-            ts=dsm.get("ts"),
-        )
+        dht = raw["dht11"]
+        mq2_r = raw["mq2"]
+        mq135_r = raw["mq135"]
+        dsm = raw["dsm501a"]
 
-        # Log combined dashboard snapshot into dashboard_readings
-        store.insert_dashboard_reading(metrics, ts=metrics.get("ts"))
+        # Log raw data plus the combined dashboard snapshot
+        # (dashboard_readings); the background writer commits it
+        store.enqueue_snapshot(dht, mq2_r, mq135_r, dsm, metrics=metrics)
 
         # ------------------------------------------------------------------
         # SPIKE DETECTION + EMAIL NOTIFICATION
         # ------------------------------------------------------------------
-        # Get last N readings to compute baseline + trend
-        rows = store.get_recent_dashboard_readings(limit=60)
-
-        # Convert rows to Reading objects for spike handler
-        history = []
-        for row in rows:
-            history.append(
-                Reading(
-                    timestamp=row["ts"],
-                    values={
-                        "aqi": row.get("aqi"),
-                        "pm25": row.get("pm2_5"),
-                        "pm10": row.get("pm10"),
-                        "temp": row.get("temperature"),
-                        "humidity": row.get("humidity"),
-                        "toxic": row.get("toxic"),
-                        "flammable": row.get("flammable"),
-                        "smoke": row.get("smoke"),
-                        "voc": row.get("voc"),
-                    },
-                )
+        # Baseline + trend history: recent rows from the DB, oldest first,
+        # then this poll from memory since the writer may not have
+        # committed it yet
+        rows = read_db.recent_dashboard_readings(limit=59, before_ts=metrics["ts"])
+        history = [
+            Reading(
+                timestamp=dt.datetime.fromtimestamp(row["ts"] or 0, dt.timezone.utc),
+                values={key: row[key] for key, _ in SPIKE_METRIC_KEYS},
+            )
+            for row in rows
+        ]
+        history.append(
+            Reading(
+                timestamp=dt.datetime.fromtimestamp(metrics["ts"], dt.timezone.utc),
+                values={key: metrics.get(name) for key, name in SPIKE_METRIC_KEYS},
             )
+        )
 
         # Trigger the spike handler
         handle_new_reading_for_dashboard(history)
 
         # ------------------------------------------------------------------
 
-    except Exception as e:
-        print("Error logging dashboard sensor data:", e)
+    except Exception:
+        logger.exception("Error logging dashboard sensor data")
 
-    return jsonify({
+    return _json({
         "aqi": metrics["aqi"],
         "flame": metrics["flammable_index"],
         "humidity": metrics["humidity_percent"],
@@ -201,21 +235,21 @@ def api_dashboard():
 
 # ---------- Predictive AQI ----------
 
-@app.get("/api/aqi/forecast")
+@api.get("/api/aqi/forecast")
 def api_aqi_forecast():
     result = prediction.compute_aqi_forecast()
-    return jsonify(result)
+    return _json(result)
 
 # ---------- Settings ----------
 
-@app.get("/api/settings/latest")
+@api.get("/api/settings/latest")
 def api_get_settings():
     try:
         s = settings_store.get_latest_settings()
 
         if s is None:
             # No row yet: return sensible defaults
-            return jsonify(
+            return _json(
                 {
                     "ok": True,
                     "settings": {
@@ -228,13 +262,13 @@ def api_get_settings():
                 }
             )
 
-        return jsonify({"ok": True, "settings": s})
+        return _json({"ok": True, "settings": s})
 
     except Exception as e:
-        return jsonify({"ok": False, "error": str(e)}), 500
+        return _json({"ok": False, "error": str(e)}, 500)
 
 
-@app.post("/api/settings/save")
+@api.post("/api/settings/save")
 def api_settings_save():
     try:
         data = request.get_json(force=True) or {}
@@ -255,23 +289,28 @@ def api_settings_save():
             forecast_duration=forecast_duration,
             refresh_rate=refresh_rate,
         )
+        prediction.clear_forecast_cache()
 
-        return jsonify({"ok": True})
+        return _json({"ok": True})
     except Exception as e:
-        return jsonify({"ok": False, "error": str(e)}), 400
+        return _json({"ok": False, "error": str(e)}, 400)
 
 #---------- History Access ----------
-@app.post("/api/history/query")
+@api.post("/api/history/query")
 def api_history_query():
     try:
         data = request.get_json(force=True)
         start_ts = int(data.get("start"))
         end_ts = int(data.get("end"))
 
-        # Only return the combined dashboard table for the new UI
-        rows = read_db.fetch_range("dashboard_readings", start_ts, end_ts)
+        # Only return the combined dashboard table for the new UI.
+        # "layout": "columnar" opts into {"cols": [...], "rows": [[...]]}.
+        if data.get("layout") == "columnar":
+            rows = read_db.fetch_range_columnar("dashboard_readings", start_ts, end_ts)
+        else:
+            rows = read_db.fetch_range("dashboard_readings", start_ts, end_ts)
 
-        return jsonify({
+        return _json({
             "ok": True,
             "data": {
                 "dashboard_readings": rows
@@ -279,31 +318,39 @@ def api_history_query():
         })
 
     except Exception as e:
-        return jsonify({"ok": False, "error": str(e)}), 400
+        return _json({"ok": False, "error": str(e)}, 400)
       
-@app.get("/api/history/download")
+@api.get("/api/history/download")
 def api_history_download():
   fmt = request.args.get("fmt", "csv")
 
   try:
       content, content_type, filename = read_db.export_dashboard_history(fmt)
 
-      return content, 200, {
-          "Content-Type": content_type,
-          "Content-Disposition": f"attachment; filename={filename}",
-      }
+      if not isinstance(content, (str, bytes)):
+          # CSV comes as a generator, send it while sqlite is still reading
+          content = stream_with_context(content)
+
+      return Response(
+          content,
+          status=200,
+          headers={
+              "Content-Type": content_type,
+              "Content-Disposition": f"attachment; filename={filename}",
+          },
+      )
 
   except ImportError as e:
-      return jsonify({"ok": False, "error": str(e)}), 500
+      return _json({"ok": False, "error": str(e)}, 500)
 
   except ValueError as e:
-      return jsonify({"ok": False, "error": str(e)}), 400
+      return _json({"ok": False, "error": str(e)}, 400)
 
   except Exception as e:
-      return jsonify({"ok": False, "error": str(e)}), 500
+      return _json({"ok": False, "error": str(e)}, 500)
 
 # --------- Alerts ----------
-@app.get("/api/alerts")
+@api.get("/api/alerts")
 def api_alerts():
     alerts = []
     try:
@@ -324,7 +371,8 @@ def api_alerts():
             alerts = [
                 {
                     "id": row["id"],
-                    "ts": row["ts"],
+                    # stored as unix epoch, sent as ISO-8601 UTC
+                    "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(row["ts"])),
                     "recipient": row["recipient"],
                     "subject": row["subject"],
                 }
@@ -332,10 +380,10 @@ def api_alerts():
             ]
     except Exception as e:
         print("Error reading alerts:", type(e).__name__, e)
-        return jsonify({"ok": False, "error": "failed_to_read_alerts"}), 500
+        return _json({"ok": False, "error": "failed_to_read_alerts"}, 500)
 
-    return jsonify({"ok": True, "alerts": alerts})
-@app.get("/api/alerts/<int:alert_id>/download")
+    return _json({"ok": True, "alerts": alerts})
+@api.get("/api/alerts/<int:alert_id>/download")
 def api_alert_download(alert_id: int):
     try:
         # Make sure the DB file and table exist
@@ -354,10 +402,10 @@ def api_alert_download(alert_id: int):
             row = cur.fetchone()
     except Exception as e:
         print("Error reading alert body:", type(e).__name__, e)
-        return jsonify({"ok": False, "error": "failed_to_read_alert"}), 500
+        return _json({"ok": False, "error": "failed_to_read_alert"}, 500)
 
     if row is None:
-        return jsonify({"ok": False, "error": "not_found"}), 404
+        return _json({"ok": False, "error": "not_found"}, 404)
 
     body = row["alert_msg"] or ""
     filename = f"alert_{row['id']}.txt"
@@ -373,4 +421,4 @@ def api_alert_download(alert_id: int):
 # ---------- Main ----------
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=False)
+    create_app().run(host="0.0.0.0", port=5000, debug=False, threaded=True)
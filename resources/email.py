@@ -1,10 +1,12 @@
 # resources/email.py
 
+import atexit
 import os
 import smtplib
 import ssl
 import sqlite3
-import datetime as dt
+import threading
+import time
 from email.message import EmailMessage
 from typing import Dict, Iterable, Optional
 
@@ -31,42 +33,149 @@ def _get_smtp_config() -> Dict[str, object]:
     }
 
 
+# The schema only has to be created once per process, and alert rows go
+# through one long-lived connection instead of a fresh one per alert.
+_alerts_schema_ready = False
+_alert_db_lock = threading.Lock()
+_alert_conn: Optional[sqlite3.Connection] = None
+
+
 def _ensure_alert_log_table() -> None:
     """
     Ensure alerts.db + email_alert_logs table exist.
     Now includes subject column.
     """
+    global _alerts_schema_ready
+    if _alerts_schema_ready:
+        return
+
     with sqlite3.connect(ALERT_DB_PATH) as conn:
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS email_alert_logs (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                ts TEXT NOT NULL,
+                ts INTEGER NOT NULL,
                 recipient TEXT NOT NULL,
                 subject TEXT NOT NULL,
                 alert_msg TEXT NOT NULL
             )
             """
         )
+        _migrate_text_ts(conn)
         conn.commit()
+    _alerts_schema_ready = True
 
 
-def log_email_alert(recipient: str, subject: str, alert_msg: str) -> None:
+def _migrate_text_ts(conn: sqlite3.Connection) -> None:
     """
-    Log each successful email alert into alerts.db.
+    Older alerts.db files store ts as ISO-8601 UTC text. Rebuild the
+    table once with unix-epoch integers like the sensor tables use.
     """
-    _ensure_alert_log_table()
-    ts = dt.datetime.utcnow().isoformat()
+    cols = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(email_alert_logs)")}
+    if cols.get("ts", "").upper() != "TEXT":
+        return
 
-    with sqlite3.connect(ALERT_DB_PATH) as conn:
+    # One transaction: on any error the old table is left as it was.
+    # Timestamps SQLite cannot parse become 0 instead of breaking NOT NULL.
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
         conn.execute(
             """
-            INSERT INTO email_alert_logs (ts, recipient, subject, alert_msg)
-            VALUES (?, ?, ?, ?)
-            """,
-            (ts, recipient, subject, alert_msg),
+            CREATE TABLE email_alert_logs_new (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts INTEGER NOT NULL,
+                recipient TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                alert_msg TEXT NOT NULL
+            )
+            """
         )
-        conn.commit()
+        conn.execute(
+            """
+            INSERT INTO email_alert_logs_new (id, ts, recipient, subject, alert_msg)
+                SELECT id, COALESCE(CAST(strftime('%s', ts) AS INTEGER), 0),
+                       recipient, subject, alert_msg
+                FROM email_alert_logs
+            """
+        )
+        conn.execute("DROP TABLE email_alert_logs")
+        conn.execute("ALTER TABLE email_alert_logs_new RENAME TO email_alert_logs")
+
+
+def _get_alert_conn() -> sqlite3.Connection:
+    """Shared alerts.db connection; caller must hold _alert_db_lock."""
+    global _alert_conn
+    if _alert_conn is None:
+        _alert_conn = sqlite3.connect(ALERT_DB_PATH, check_same_thread=False)
+    return _alert_conn
+
+
+def log_email_alert(recipient: str, subject: str, alert_msg: str) -> None:
+    """
+    Log each successful email alert into alerts.db.
+    """
+    _ensure_alert_log_table()
+    ts = int(time.time())
+
+    with _alert_db_lock:
+        conn = _get_alert_conn()
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO email_alert_logs (ts, recipient, subject, alert_msg)
+                VALUES (?, ?, ?, ?)
+                """,
+                (ts, recipient, subject, alert_msg),
+            )
+
+
+# One SMTP session is kept open and reused, so a burst of alerts does not
+# pay for a TCP + STARTTLS + AUTH round trip each time.
+_smtp_lock = threading.Lock()
+_smtp_conn: Optional[smtplib.SMTP] = None
+
+
+def _get_smtp(config: Dict[str, object]) -> smtplib.SMTP:
+    """
+    Return the shared SMTP session, reconnecting if it was dropped.
+    Caller must hold _smtp_lock.
+    """
+    global _smtp_conn
+
+    if _smtp_conn is not None:
+        try:
+            if _smtp_conn.noop()[0] == 250:
+                return _smtp_conn
+        except (smtplib.SMTPException, OSError):
+            pass
+        _close_smtp()
+
+    # A timeout keeps a stalled server from blocking every other sender on _smtp_lock
+    server = smtplib.SMTP(config["host"], config["port"], timeout=10)
+    try:
+        server.set_debuglevel(0)
+        server.starttls(context=ssl.create_default_context())
+        server.login(config["username"], config["password"])
+    except (smtplib.SMTPException, OSError):
+        server.close()
+        raise
+    _smtp_conn = server
+    return server
+
+
+def _close_smtp() -> None:
+    global _smtp_conn
+
+    server, _smtp_conn = _smtp_conn, None
+    if server is None:
+        return
+    try:
+        server.quit()
+    except (smtplib.SMTPException, OSError):
+        server.close()
+
+
+atexit.register(_close_smtp)
 
 
 def send_email(
@@ -87,12 +196,21 @@ def send_email(
     if html_body:
         msg.add_alternative(html_body, subtype="html")
 
-    context = ssl.create_default_context()
-
-    with smtplib.SMTP(config["host"], config["port"]) as server:
-        server.starttls(context=context)
-        server.login(config["username"], config["password"])
-        server.send_message(msg)
+    with _smtp_lock:
+        try:
+            _get_smtp(config).send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # The server dropped us between the NOOP and the send; retry once.
+            _close_smtp()
+            try:
+                _get_smtp(config).send_message(msg)
+            except (smtplib.SMTPException, OSError):
+                _close_smtp()
+                raise
+        except (smtplib.SMTPException, OSError):
+            # Don't hand a session in an unknown state to the next alert
+            _close_smtp()
+            raise
 
 
 def send_spike_alert_if_enabled(
@@ -1,4 +1,5 @@
 # resources/gen_message.py
+from functools import lru_cache
 from typing import Dict, Iterable, List, Optional, Tuple
 
 # Sensor keys match the dashboard_readings table in store.py
@@ -54,6 +55,41 @@ SENSOR_TIPS: Dict[str, str] = {
 }
 
 
+# Fixed parts of the alert bodies; build_alert_message only fills the
+# slots. The optional trend/tips slots carry their own trailing newline.
+_PLAIN_TMPL = (
+    "Hello,\n"
+    "\n"
+    "Your air quality monitor has detected a spike in the following sensors:\n"
+    "\n"
+    "{bullets}\n"
+    "\n"
+    "{trend}"
+    "{tips}"
+    "This message was generated automatically by your monitoring system.\n"
+    "If you continue to receive alerts frequently, consider adjusting your\n"
+    "notification settings or inspecting your environment for issues.\n"
+    "\n"
+    "Stay safe,"
+)
+
+_HTML_TMPL = (
+    "<html><body>\n"
+    "<p>Hello,</p>\n"
+    "<p>Your air quality monitor has detected a spike in the following sensors:</p>\n"
+    "<ul>\n"
+    "{items}\n"
+    "</ul>\n"
+    "{trend}"
+    "{tips}"
+    "<p>This message was generated automatically by your monitoring system.</p>\n"
+    "<p>If you receive alerts frequently, consider adjusting your notification "
+    "settings or inspecting your environment.</p>\n"
+    "<p>Stay safe,</p>\n"
+    "</body></html>"
+)
+
+
 def _sensor_display_name(sensor_key: str) -> str:
     return SENSOR_LABELS.get(sensor_key, sensor_key)
 
@@ -67,15 +103,6 @@ def _format_value(value: Optional[float]) -> str:
         return str(value)
 
 
-def _format_spike_line(sensor_key: str, metrics: Optional[Dict[str, float]]) -> str:
-    label = _sensor_display_name(sensor_key)
-    if metrics is None:
-        return f"- {label}: spike detected"
-
-    value = metrics.get(sensor_key)
-    return f"- {label}: { _format_value(value) } (spike detected)"
-
-
 def _build_trend_sentence(
     aqi_trend: Optional[Dict[str, float]],
     forecast_window_minutes: Optional[int],
@@ -125,12 +152,37 @@ def _build_trend_sentence(
 
 
 def _build_safety_tips(spiking_sensors: Iterable[str]) -> List[str]:
-    tips: List[str] = []
-    for key in spiking_sensors:
-        tip = SENSOR_TIPS.get(key)
-        if tip and tip not in tips:
-            tips.append(tip)
-    return tips
+    # dict.fromkeys dedups while keeping first-seen order
+    return list(dict.fromkeys(t for t in (SENSOR_TIPS.get(k) for k in spiking_sensors) if t))
+
+
+@lru_cache(maxsize=64)
+def _static_parts(sensors: Tuple[str, ...]) -> Tuple[str, str, str]:
+    """
+    (subject, plain tips block, html tips block) for one spiking sensor set.
+
+    These depend only on which sensors spiked, and the same sets keep
+    recurring, so they are built once per set.
+    """
+    has_aqi = "aqi" in frozenset(sensors)
+    if has_aqi and len(sensors) == 1:
+        subject = "Alert: AQI has spiked on your air quality monitor"
+    elif has_aqi:
+        subject = "Alert: AQI and other sensors have spiked on your monitor"
+    else:
+        subject = "Alert: One or more sensors have spiked on your monitor"
+
+    tips = _build_safety_tips(sensors)
+    if not tips:
+        return subject, "", ""
+
+    plain_tips = "Suggested actions:\n" + "\n".join(f"- {tip}" for tip in tips) + "\n\n"
+    html_tips = (
+        "<p>Suggested actions:</p>\n<ul>\n"
+        + "\n".join(f"<li>{tip}</li>" for tip in tips)
+        + "\n</ul>\n"
+    )
+    return subject, plain_tips, html_tips
 
 
 def build_alert_message(
@@ -159,7 +211,7 @@ def build_alert_message(
     Returns:
         (subject, plain_text_body, html_body_or_none)
     """
-    sensor_list = list(spiking_sensors)
+    sensor_list = tuple(spiking_sensors)
     if not sensor_list:
         subject = "Air quality update from your monitor"
         body = (
@@ -168,84 +220,33 @@ def build_alert_message(
         )
         return subject, body, None
 
-    # Subject
-    if "aqi" in sensor_list and len(sensor_list) == 1:
-        subject = "Alert: AQI has spiked on your air quality monitor"
-    elif "aqi" in sensor_list:
-        subject = "Alert: AQI and other sensors have spiked on your monitor"
-    else:
-        subject = "Alert: One or more sensors have spiked on your monitor"
-
-    # Heading and spike summary
-    lines: List[str] = []
-    lines.append("Hello,")
-    lines.append("")
-    lines.append(
-        "Your air quality monitor has detected a spike in the following sensors:"
-    )
-    lines.append("")
-
-    for sensor_key in sensor_list:
-        lines.append(_format_spike_line(sensor_key, metrics))
-
-    lines.append("")
-
+    subject, plain_tips, html_tips = _static_parts(sensor_list)
     trend_sentence = _build_trend_sentence(aqi_trend, forecast_window_minutes)
-    if trend_sentence:
-        lines.append(trend_sentence)
-        lines.append("")
-
-    tips = _build_safety_tips(sensor_list)
-    if tips:
-        lines.append("Suggested actions:")
-        for tip in tips:
-            lines.append(f"- {tip}")
-        lines.append("")
-
-    lines.append("This message was generated automatically by your monitoring system.")
-    lines.append("If you continue to receive alerts frequently, consider adjusting your")
-    lines.append("notification settings or inspecting your environment for issues.")
-    lines.append("")
-    lines.append("Stay safe,")
-
-    plain_body = "\n".join(lines)
-
-    # Optional HTML body
-    html_lines: List[str] = []
-    html_lines.append("<html><body>")
-    html_lines.append("<p>Hello,</p>")
-    html_lines.append(
-        "<p>Your air quality monitor has detected a spike in the following sensors:</p>"
-    )
-    html_lines.append("<ul>")
-    for sensor_key in sensor_list:
-        label = _sensor_display_name(sensor_key)
-        value_str = _format_value(metrics.get(sensor_key) if metrics else None)
-        html_lines.append(
-            f"<li><strong>{label}</strong>: {value_str} (spike detected)</li>"
-        )
-    html_lines.append("</ul>")
 
-    if trend_sentence:
-        html_lines.append(f"<p>{trend_sentence}</p>")
+    # (label, value) per sensor, shared by the plain and HTML bodies
+    formatted = [
+        (_sensor_display_name(k), _format_value(metrics.get(k) if metrics else None))
+        for k in sensor_list
+    ]
 
-    if tips:
-        html_lines.append("<p>Suggested actions:</p>")
-        html_lines.append("<ul>")
-        for tip in tips:
-            html_lines.append(f"<li>{tip}</li>")
-        html_lines.append("</ul>")
+    if metrics is None:
+        bullets = "\n".join(f"- {label}: spike detected" for label, _ in formatted)
+    else:
+        bullets = "\n".join(f"- {label}: {value} (spike detected)" for label, value in formatted)
 
-    html_lines.append(
-        "<p>This message was generated automatically by your monitoring system.</p>"
+    plain_body = _PLAIN_TMPL.format(
+        bullets=bullets,
+        trend=f"{trend_sentence}\n\n" if trend_sentence else "",
+        tips=plain_tips,
     )
-    html_lines.append(
-        "<p>If you receive alerts frequently, consider adjusting your notification "
-        "settings or inspecting your environment.</p>"
-    )
-    html_lines.append("<p>Stay safe,</p>")
-    html_lines.append("</body></html>")
 
-    html_body = "\n".join(html_lines)
+    html_body = _HTML_TMPL.format(
+        items="\n".join(
+            f"<li><strong>{label}</strong>: {value} (spike detected)</li>"
+            for label, value in formatted
+        ),
+        trend=f"<p>{trend_sentence}</p>\n" if trend_sentence else "",
+        tips=html_tips,
+    )
 
     return subject, plain_body, html_body
@@ -1,8 +1,11 @@
 # resources/read.py
 import sqlite3
+import threading
 import time
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict
+from typing import Iterator, List, Dict, Optional
 import csv
 from .store import _connect
 import io
@@ -14,32 +17,76 @@ SETTINGS_DB_PATH = BASE_DIR / "settings.db"
 
 # ---------- Sensor DB (unchanged) ----------
 
-def _connect_sensor() -> sqlite3.Connection:
-    conn = sqlite3.connect(str(SENSOR_DB_PATH), timeout=5.0)
+# One read connection per DB is opened once per process and reused, so each
+# query skips the connect cost and keeps a warm page/statement cache.
+# Flask's threaded server runs every request on a fresh thread, so
+# per-thread connections would pile up unclosed; a lock serialises use of
+# the shared one instead.
+_sensor_lock = threading.Lock()
+_sensor_conn: Optional[sqlite3.Connection] = None
+_settings_lock = threading.Lock()
+_settings_conn: Optional[sqlite3.Connection] = None
+
+
+def _open_reader(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        str(path), timeout=5.0, cached_statements=128, check_same_thread=False
+    )
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA cache_size=-20000")
+    conn.execute("PRAGMA mmap_size=67108864")
     return conn
 
 
+@contextmanager
+def _sensor_reader() -> Iterator[sqlite3.Connection]:
+    """Shared sensor.db connection, held under _sensor_lock for the block."""
+    global _sensor_conn
+    with _sensor_lock:
+        if _sensor_conn is None:
+            _sensor_conn = _open_reader(SENSOR_DB_PATH)
+        yield _sensor_conn
+
+
+@contextmanager
+def _settings_reader() -> Iterator[sqlite3.Connection]:
+    """Shared settings.db connection, held under _settings_lock for the block."""
+    global _settings_conn
+    with _settings_lock:
+        if _settings_conn is None:
+            _settings_conn = _open_reader(SETTINGS_DB_PATH)
+        yield _settings_conn
+
+
+SENSOR_TABLES = {
+    "dht11": "dht11_readings",
+    "mq2": "mq2_readings",
+    "mq135": "mq135_readings",
+    "dsm501a": "dsm501a_readings",
+}
+
+
+# One fixed SQL string per table, built once, so every call passes the
+# identical text and hits the connection's statement cache.
+_RECENT_SQL = {
+    table: f"SELECT * FROM {table} WHERE ts >= ? ORDER BY ts ASC LIMIT ?"
+    for table in SENSOR_TABLES.values()
+}
+
+
+def _select_recent(cur: sqlite3.Cursor, table: str, cutoff: int, max_rows: int) -> List[Dict]:
+    cur.execute(_RECENT_SQL[table], (cutoff, max_rows))
+    rows = cur.fetchall()
+    return [dict(r) for r in rows]
+
+
 def _fetch_rows(table: str, min_seconds_back: int, max_rows: int) -> List[Dict]:
     now = int(time.time())
     cutoff = now - min_seconds_back
 
-    conn = _connect_sensor()
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            f"""
-            SELECT * FROM {table}
-            WHERE ts >= ?
-            ORDER BY ts ASC
-            LIMIT ?
-            """,
-            (cutoff, max_rows),
-        )
-        rows = cur.fetchall()
-        return [dict(r) for r in rows]
-    finally:
-        conn.close()
+    with _sensor_reader() as conn:
+        return _select_recent(conn.cursor(), table, cutoff, max_rows)
 
 
 def recent_dht11(min_seconds_back: int = 3600, max_rows: int = 2000) -> List[Dict]:
@@ -58,6 +105,105 @@ def recent_dsm501a(min_seconds_back: int = 3600, max_rows: int = 2000) -> List[D
     return _fetch_rows("dsm501a_readings", min_seconds_back, max_rows)
 
 
+# Value columns per sensor table, in the order recent_all() maps them
+# onto the v1..v3 slots of its UNION ALL.
+SENSOR_COLUMNS = {
+    "dht11": ("temperature_c", "humidity_percent"),
+    "mq2": ("raw", "voltage"),
+    "mq135": ("raw", "voltage"),
+    "dsm501a": ("low_pulse_ms", "ratio", "concentration_ug_m3"),
+}
+
+
+def _recent_all_sql() -> str:
+    parts = []
+    for key, table in SENSOR_TABLES.items():
+        cols = list(SENSOR_COLUMNS[key]) + ["NULL"] * (3 - len(SENSOR_COLUMNS[key]))
+        parts.append(
+            f"SELECT * FROM (SELECT '{key}' AS src, id, ts, "
+            f"{cols[0]} AS v1, {cols[1]} AS v2, {cols[2]} AS v3 "
+            f"FROM {table} WHERE ts >= ? ORDER BY ts ASC LIMIT ?)"
+        )
+    return "\nUNION ALL\n".join(parts)
+
+
+RECENT_ALL_SQL = _recent_all_sql()
+
+
+def recent_all(min_seconds_back: int = 3600, max_rows: int = 2000) -> Dict[str, List[Dict]]:
+    """
+    Recent rows of all four sensor tables in one UNION ALL query.
+
+    Returns {"dht11": [...], "mq2": [...], "mq135": [...], "dsm501a": [...]},
+    every table cut at the same timestamp, rows shaped like recent_<sensor>().
+    """
+    cutoff = int(time.time()) - min_seconds_back
+
+    out: Dict[str, List[Dict]] = {key: [] for key in SENSOR_TABLES}
+    with _sensor_reader() as conn:
+        cur = conn.cursor()
+        cur.execute(RECENT_ALL_SQL, (cutoff, max_rows) * len(SENSOR_TABLES))
+        for src, row_id, ts, v1, v2, v3 in cur:
+            row = {"id": row_id, "ts": ts}
+            row.update(zip(SENSOR_COLUMNS[src], (v1, v2, v3)))
+            out[src].append(row)
+    return out
+
+
+@lru_cache(maxsize=4)
+def _cached_recent_all(min_seconds_back: int, max_rows: int, bucket: int) -> Dict[str, List[Dict]]:
+    # bucket only takes part in the cache key
+    return recent_all(min_seconds_back, max_rows)
+
+
+def recent_all_cached(
+    min_seconds_back: int = 3600,
+    max_rows: int = 2000,
+    refresh_rate: int = 5,
+) -> Dict[str, List[Dict]]:
+    """
+    recent_all() reused for back-to-back calls within the same
+    refresh_rate second bucket. The rows are shared, do not modify them.
+    """
+    bucket = int(time.time()) // max(1, refresh_rate)
+    return _cached_recent_all(min_seconds_back, max_rows, bucket)
+
+
+def clear_recent_cache() -> None:
+    _cached_recent_all.cache_clear()
+
+
+def latest_dsm501a_ts() -> int | None:
+    """Timestamp of the newest DSM501A row, or None if the table is empty."""
+    with _sensor_reader() as conn:
+        row = conn.execute("SELECT MAX(ts) FROM dsm501a_readings").fetchone()
+    return row[0] if row else None
+
+
+RECENT_DASHBOARD_SQL = """
+    SELECT * FROM (
+        SELECT * FROM dashboard_readings
+        WHERE ts < ?
+        ORDER BY ts DESC
+        LIMIT ?
+    )
+    ORDER BY ts ASC
+"""
+
+
+def recent_dashboard_readings(limit: int = 60, before_ts: int | None = None) -> List[Dict]:
+    """
+    The newest `limit` dashboard_readings rows, oldest first. Rows at or
+    after before_ts are left out, so a caller can append its own current
+    reading without counting it twice.
+    """
+    if before_ts is None:
+        before_ts = int(time.time()) + 1
+    with _sensor_reader() as conn:
+        rows = conn.execute(RECENT_DASHBOARD_SQL, (before_ts, limit)).fetchall()
+    return [dict(r) for r in rows]
+
+
 # ---------- Settings DB ----------
 
 def get_latest_settings() -> Dict | None:
@@ -65,114 +211,154 @@ def get_latest_settings() -> Dict | None:
     Return the latest settings row from settings.db, or None if the
     DB/table is not ready or empty.
     """
-    conn = sqlite3.connect(str(SETTINGS_DB_PATH), timeout=5.0)
-    conn.row_factory = sqlite3.Row
     try:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT email, notifications, forecast_duration, refresh_rate, ts
-            FROM settings
-            ORDER BY ts DESC
-            LIMIT 1
-            """
-        )
-        row = cur.fetchone()
+        with _settings_reader() as conn:
+            row = conn.execute(
+                """
+                SELECT email, notifications, forecast_duration, refresh_rate, ts
+                FROM settings
+                ORDER BY ts DESC
+                LIMIT 1
+                """
+            ).fetchone()
         return dict(row) if row else None
     except sqlite3.OperationalError:
         # e.g. "no such table: settings"
         return None
-    finally:
-        conn.close()
+
+def _select_range(conn: sqlite3.Connection, table: str, start_ts: int, end_ts: int) -> sqlite3.Cursor:
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        SELECT *
+        FROM {table}
+        WHERE ts BETWEEN ? AND ?
+        ORDER BY ts ASC
+        """,
+        (start_ts, end_ts)
+    )
+    return cur
+
 
 def fetch_range(table: str, start_ts: int, end_ts: int):
-    conn = _connect_sensor()
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            f"""
-            SELECT *
-            FROM {table}
-            WHERE ts BETWEEN ? AND ?
-            ORDER BY ts ASC
-            """,
-            (start_ts, end_ts)
-        )
-        rows = cur.fetchall()
-        return [dict(r) for r in rows]
-    finally:
-        conn.close()
-def export_dashboard_history(fmt: str = "csv"):
+    with _sensor_reader() as conn:
+        rows = _select_range(conn, table, start_ts, end_ts).fetchall()
+    return [dict(r) for r in rows]
+
+
+def fetch_range_columnar(table: str, start_ts: int, end_ts: int) -> Dict:
     """
-    Build a CSV or XLSX export of the dashboard_readings table.
+    Same rows as fetch_range() but as {"cols": [...], "rows": [[...], ...]}.
 
-    Returns: (content_bytes_or_str, content_type, filename)
+    Column names are sent once instead of once per row, and no dict is
+    built per row, which suits callers that only serialise to JSON.
     """
-    fmt = (fmt or "csv").lower()
-    conn = _connect()
+    with _sensor_reader() as conn:
+        cur = _select_range(conn, table, start_ts, end_ts)
+        cols = [d[0] for d in cur.description]
+        return {"cols": cols, "rows": [tuple(r) for r in cur]}
+DASHBOARD_EXPORT_HEADERS = [
+    "Time",
+    "AQI",
+    "PM2.5 (µg/m³)",
+    "PM10 (µg/m³)",
+    "Temperature (°C)",
+    "Humidity (%)",
+    "Toxic index",
+    "Flammable index",
+    "Smoke index",
+    "VOC index",
+]
+
+# Size of each CSV piece handed to the HTTP response while streaming
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+def _select_dashboard_history(conn: sqlite3.Connection) -> sqlite3.Cursor:
     cur = conn.cursor()
-
+    cur.execute(
+        """
+        SELECT ts, aqi, pm25, pm10, temp, humidity, toxic, flammable, smoke, voc
+        FROM dashboard_readings
+        ORDER BY ts
+        """
+    )
+    return cur
+
+
+def _fmt_num(v, decimals=3):
+    if v is None:
+        return ""
     try:
-        cur.execute(
-            """
-            SELECT ts, aqi, pm25, pm10, temp, humidity, toxic, flammable, smoke, voc
-            FROM dashboard_readings
-            ORDER BY ts
-            """
-        )
-        rows = cur.fetchall()
-    finally:
-        conn.close()
+        return f"{float(v):.{decimals}f}"
+    except Exception:
+        return v
 
-    t = int(time.time())
-    filename = f"dashboard_history_{t}.{fmt}"
 
-    headers = [
-        "Time",
-        "AQI",
-        "PM2.5 (µg/m³)",
-        "PM10 (µg/m³)",
-        "Temperature (°C)",
-        "Humidity (%)",
-        "Toxic index",
-        "Flammable index",
-        "Smoke index",
-        "VOC index",
-    ]
-
-    def fmt_num(v, decimals=3):
-        if v is None:
-            return ""
-        try:
-            return f"{float(v):.{decimals}f}"
-        except Exception:
-            return v
+# Decimals per exported value column (AQI .. VOC); PM columns get one more.
+_CSV_COL_DECIMALS = (3, 4, 4, 3, 3, 3, 3, 3, 3)
+_CSV_COL_FMTS = tuple(f"{{:.{d}f}}".format for d in _CSV_COL_DECIMALS)
 
-    if fmt == "csv":
+
+def _iter_dashboard_csv(conn: sqlite3.Connection, rows: sqlite3.Cursor) -> Iterator[str]:
+    """
+    Yield the CSV export in EXPORT_CHUNK_BYTES pieces, formatting rows as
+    sqlite produces them so memory does not grow with the history size.
+
+    rows is the already executed history query; conn is closed when the
+    generator finishes.
+    """
+    try:
         buffer = io.StringIO()
         writer = csv.writer(buffer)
 
-        writer.writerow(headers)
+        writer.writerow(DASHBOARD_EXPORT_HEADERS)
 
         for row in rows:
             ts, aqi, pm25, pm10, temp, humidity, toxic, flammable, smoke, voc = row
             time_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts or 0))
-            writer.writerow([
-                time_str,
-                fmt_num(aqi, 3),
-                fmt_num(pm25, 4),
-                fmt_num(pm10, 4),
-                fmt_num(temp, 3),
-                fmt_num(humidity, 3),
-                fmt_num(toxic, 3),
-                fmt_num(flammable, 3),
-                fmt_num(smoke, 3),
-                fmt_num(voc, 3),
-            ])
-
-        content = buffer.getvalue()
-        content_type = "text/csv"
-        return content, content_type, filename
+            values = (aqi, pm25, pm10, temp, humidity, toxic, flammable, smoke, voc)
+            try:
+                cells = [f(v) if v is not None else "" for f, v in zip(_CSV_COL_FMTS, values)]
+            except (TypeError, ValueError):
+                # non-numeric text in a REAL column, keep it as stored
+                cells = [_fmt_num(v, d) for v, d in zip(values, _CSV_COL_DECIMALS)]
+            writer.writerow([time_str, *cells])
+
+            if buffer.tell() >= EXPORT_CHUNK_BYTES:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue()
+    finally:
+        conn.close()
+
+
+def export_dashboard_history(fmt: str = "csv"):
+    """
+    Build a CSV or XLSX export of the dashboard_readings table.
+
+    Returns: (content, content_type, filename)
+
+    For CSV, content is a generator of text chunks meant to be streamed.
+    The query itself runs here, so sqlite errors are raised to the caller
+    before any part of the response is sent.
+    For XLSX, content is the finished workbook bytes.
+    """
+    fmt = (fmt or "csv").lower()
+
+    t = int(time.time())
+    filename = f"dashboard_history_{t}.{fmt}"
+
+    if fmt == "csv":
+        conn = _connect()
+        try:
+            rows = _select_dashboard_history(conn)
+        except Exception:
+            conn.close()
+            raise
+        return _iter_dashboard_csv(conn, rows), "text/csv", filename
 
     if fmt == "xlsx":
         try:
@@ -181,29 +367,31 @@ def export_dashboard_history(fmt: str = "csv"):
             raise ImportError("xlsxwriter not installed. Install with: pip3 install xlsxwriter")
 
         output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output)
+        # constant_memory flushes each finished row to a temp file, so
+        # rows are written straight off the cursor instead of fetchall().
+        workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
         ws = workbook.add_worksheet("dashboard")
 
-        for c, h in enumerate(headers):
-            ws.write(0, c, h)
+        # Numbers are written as numeric cells; the column formats give
+        # the same precision the CSV export uses.
+        num_fmt = workbook.add_format({"num_format": "0.000"})
+        pm_fmt = workbook.add_format({"num_format": "0.0000"})
+        ws.set_column(0, 0, 20)
+        ws.set_column(1, 1, None, num_fmt)
+        ws.set_column(2, 3, None, pm_fmt)
+        ws.set_column(4, 9, None, num_fmt)
 
-        row_idx = 1
-        for row in rows:
-            ts, aqi, pm25, pm10, temp, humidity, toxic, flammable, smoke, voc = row
-            time_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts or 0))
+        ws.write_row(0, 0, DASHBOARD_EXPORT_HEADERS)
 
-            ws.write(row_idx, 0, time_str)
-            ws.write(row_idx, 1, fmt_num(aqi, 3))
-            ws.write(row_idx, 2, fmt_num(pm25, 4))
-            ws.write(row_idx, 3, fmt_num(pm10, 4))
-            ws.write(row_idx, 4, fmt_num(temp, 3))
-            ws.write(row_idx, 5, fmt_num(humidity, 3))
-            ws.write(row_idx, 6, fmt_num(toxic, 3))
-            ws.write(row_idx, 7, fmt_num(flammable, 3))
-            ws.write(row_idx, 8, fmt_num(smoke, 3))
-            ws.write(row_idx, 9, fmt_num(voc, 3))
-
-            row_idx += 1
+        conn = _connect()
+        try:
+            rows = _select_dashboard_history(conn)
+            for row_idx, row in enumerate(rows, start=1):
+                ts = row[0]
+                time_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts or 0))
+                ws.write_row(row_idx, 0, (time_str,) + tuple(row[1:]))
+        finally:
+            conn.close()
 
         workbook.close()
         output.seek(0)
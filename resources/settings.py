@@ -1,13 +1,41 @@
 # resources/settings.py
 import sqlite3
 import os
+import threading
+import time
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "settings.db")
 
+# Settings only change when the user saves them, so the latest row is
+# memoised for a few seconds and dropped on every save.
+SETTINGS_CACHE_TTL = 5.0
+# gen is bumped on every invalidation, so a load that raced a save does
+# not put the old row back into the cache
+_settings_cache = {"val": None, "exp": 0.0, "gen": 0}
+_settings_lock = threading.Lock()
+
+
+# journal_mode is stored in the DB file, so it is switched once per process
+_wal_ready = False
+
+
+def _connect() -> sqlite3.Connection:
+    """Open settings.db with the same pragmas as the sensor DB."""
+    global _wal_ready
+    conn = sqlite3.connect(DB_PATH)
+    if not _wal_ready:
+        conn.execute("PRAGMA journal_mode=WAL")
+        _wal_ready = True
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-4000")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
 
 def init_db() -> None:
     """Create settings DB/table if they do not exist."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
     cur = conn.cursor()
     cur.execute(
         """
@@ -31,8 +59,7 @@ def save_settings(email, notifications, forecast_duration, refresh_rate) -> None
 
     notifications is stored as 0/1, everything else as given (or NULL).
     """
-    init_db()
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
     cur = conn.cursor()
     cur.execute(
         """
@@ -48,6 +75,14 @@ def save_settings(email, notifications, forecast_duration, refresh_rate) -> None
     )
     conn.commit()
     conn.close()
+    invalidate_settings_cache()
+
+
+def invalidate_settings_cache() -> None:
+    with _settings_lock:
+        _settings_cache["val"] = None
+        _settings_cache["exp"] = 0.0
+        _settings_cache["gen"] += 1
 
 
 def get_latest_settings():
@@ -62,9 +97,27 @@ def get_latest_settings():
             "refresh_rate": 10,
             "ts": 1735800000
         }
+
+    Served from a short-lived in-process cache, see SETTINGS_CACHE_TTL.
     """
-    init_db()
-    conn = sqlite3.connect(DB_PATH)
+    with _settings_lock:
+        if time.monotonic() < _settings_cache["exp"]:
+            val = _settings_cache["val"]
+            return dict(val) if val is not None else None
+        gen = _settings_cache["gen"]
+
+    val = _load_latest_settings()
+
+    with _settings_lock:
+        # Only cache the row if no save invalidated the cache meanwhile
+        if _settings_cache["gen"] == gen:
+            _settings_cache["val"] = val
+            _settings_cache["exp"] = time.monotonic() + SETTINGS_CACHE_TTL
+    return dict(val) if val is not None else None
+
+
+def _load_latest_settings():
+    conn = _connect()
     conn.row_factory = sqlite3.Row
     cur = conn.cursor()
     cur.execute(
@@ -88,3 +141,8 @@ def get_latest_settings():
         "refresh_rate": row["refresh_rate"],
         "ts": row["ts"],
     }
+
+
+# The table is created once when the module is imported, not on every
+# read and save.
+init_db()
@@ -5,10 +5,12 @@ from __future__ import annotations
 import datetime as dt
 import os
 import sqlite3
+import time
 from dataclasses import dataclass
-from statistics import mean
 from typing import Dict, List, Optional, Sequence
 
+import numpy as np
+
 from .email import send_spike_alert_if_enabled
 from .settings import get_latest_settings
 
@@ -56,6 +58,19 @@ MIN_RELATIVE_INCREASE: Dict[str, float] = {
     "voc": 50.0,
 }
 
+_AQI_COL = SENSOR_KEYS.index("aqi")
+
+# The same tables as arrays aligned to SENSOR_KEYS, for the vectorised
+# spike check (NaN: no threshold)
+_ABS_THRESH = np.array(
+    [DEFAULT_ABSOLUTE_THRESHOLDS.get(key, np.nan) for key in SENSOR_KEYS],
+    dtype=np.float64,
+)
+_MIN_DELTA = np.array(
+    [MIN_RELATIVE_INCREASE.get(key, 0.0) for key in SENSOR_KEYS],
+    dtype=np.float64,
+)
+
 
 @dataclass
 class Reading:
@@ -88,6 +103,30 @@ def _coerce_float(value: object) -> Optional[float]:
         return None
 
 
+def _values_vector(values: Dict[str, object]) -> np.ndarray:
+    """One value per SENSOR_KEYS entry, NaN where missing or not numeric."""
+    return np.array(
+        [_coerce_float(values.get(key)) for key in SENSOR_KEYS],
+        dtype=np.float64,
+    )
+
+
+def _history_matrix(history: Sequence[Reading]) -> np.ndarray:
+    """
+    Readings as an (N, len(SENSOR_KEYS)) float array, NaN where a value is
+    missing or not numeric.
+    """
+    rows = [[reading.values.get(key) for key in SENSOR_KEYS] for reading in history]
+    try:
+        return np.array(rows, dtype=np.float64)
+    except (TypeError, ValueError):
+        # some value is not a plain number, coerce one by one
+        return np.array(
+            [[_coerce_float(v) for v in row] for row in rows],
+            dtype=np.float64,
+        )
+
+
 def _compute_baseline(history: Sequence[Reading]) -> Optional[Dict[str, float]]:
     """
     Compute a simple baseline from older readings.
@@ -98,24 +137,22 @@ def _compute_baseline(history: Sequence[Reading]) -> Optional[Dict[str, float]]:
     """
     if len(history) < 2:
         return None
+    return _baseline_from_matrix(_history_matrix(history))
 
-    sensor_sums: Dict[str, List[float]] = {key: [] for key in SENSOR_KEYS}
 
-    for reading in history[:-1]:
-        for key in SENSOR_KEYS:
-            v = _coerce_float(reading.values.get(key))
-            if v is not None:
-                sensor_sums[key].append(v)
+def _baseline_from_matrix(mat: np.ndarray) -> Optional[Dict[str, float]]:
+    """_compute_baseline() on a _history_matrix(), last row excluded."""
+    older = mat[:-1]
+    present = ~np.isnan(older)
+    counts = present.sum(axis=0)
+    sums = np.where(present, older, 0.0).sum(axis=0)
 
-    baseline: Dict[str, float] = {}
-    have_any = False
-
-    for key, values in sensor_sums.items():
-        if values:
-            baseline[key] = float(mean(values))
-            have_any = True
-
-    return baseline if have_any else None
+    baseline = {
+        key: float(sums[i] / counts[i])
+        for i, key in enumerate(SENSOR_KEYS)
+        if counts[i]
+    }
+    return baseline or None
 
 
 def detect_spiking_sensors(
@@ -137,32 +174,28 @@ def detect_spiking_sensors(
 
     Returns a list of sensor keys, for example: ["aqi", "pm25", "voc"]
     """
-    thresholds = dict(DEFAULT_ABSOLUTE_THRESHOLDS)
     if absolute_thresholds:
-        thresholds.update(absolute_thresholds)
-
-    spiking: List[str] = []
-
-    for key in SENSOR_KEYS:
-        current = _coerce_float(current_values.get(key))
-        if current is None:
-            continue
-
-        # Absolute rule
-        abs_threshold = thresholds.get(key)
-        if abs_threshold is not None and current >= abs_threshold:
-            spiking.append(key)
-            continue
-
-        # Relative rule
-        if baseline_values is not None:
-            baseline = _coerce_float(baseline_values.get(key))
-            if baseline is not None and baseline > 0:
-                min_delta = MIN_RELATIVE_INCREASE.get(key, 0.0)
-                if current >= baseline * relative_factor and (current - baseline) >= min_delta:
-                    spiking.append(key)
+        thresholds = _ABS_THRESH.copy()
+        for i, key in enumerate(SENSOR_KEYS):
+            if key in absolute_thresholds:
+                thr = _coerce_float(absolute_thresholds[key])
+                thresholds[i] = np.nan if thr is None else thr
+    else:
+        thresholds = _ABS_THRESH
+
+    # NaN (missing value or threshold) compares False everywhere below
+    current = _values_vector(current_values)
+    mask = current >= thresholds
+
+    if baseline_values is not None:
+        baseline = _values_vector(baseline_values)
+        mask |= (
+            (baseline > 0)
+            & (current >= baseline * relative_factor)
+            & ((current - baseline) >= _MIN_DELTA)
+        )
 
-    return spiking
+    return [SENSOR_KEYS[i] for i in np.flatnonzero(mask)]
 
 
 def compute_aqi_trend(
@@ -183,24 +216,27 @@ def compute_aqi_trend(
     """
     if len(history) < 2:
         return None
+    return _trend_from_matrix(history, _history_matrix(history), default_window_minutes)
+
 
+def _trend_from_matrix(
+    history: Sequence[Reading],
+    mat: np.ndarray,
+    default_window_minutes: int,
+) -> Optional[Dict[str, float]]:
+    """compute_aqi_trend() on a _history_matrix() of the same history."""
     # Use first and last non None AQI values
-    first_aqi = None
-    first_time = None
-    last_aqi = None
-    last_time = None
-
-    for reading in history:
-        aqi_value = _coerce_float(reading.values.get("aqi"))
-        if aqi_value is None:
-            continue
-        if first_aqi is None:
-            first_aqi = aqi_value
-            first_time = reading.timestamp
-        last_aqi = aqi_value
-        last_time = reading.timestamp
-
-    if first_aqi is None or last_aqi is None or first_time is None or last_time is None:
+    have_aqi = np.flatnonzero(~np.isnan(mat[:, _AQI_COL]))
+    if have_aqi.size == 0:
+        return None
+
+    first, last = have_aqi[0], have_aqi[-1]
+    first_aqi = float(mat[first, _AQI_COL])
+    last_aqi = float(mat[last, _AQI_COL])
+    first_time = history[first].timestamp
+    last_time = history[last].timestamp
+
+    if first_time is None or last_time is None:
         return None
 
     delta_minutes = (last_time - first_time).total_seconds() / 60.0
@@ -221,55 +257,87 @@ def compute_aqi_trend(
 # Cooldown handling using settings.db
 # ---------------------------------------------------------------------------
 
+_alert_state_schema_ready = False
+
+
 def _ensure_alert_state_table() -> None:
     """
     Creates a small table in settings.db to track the last time an email
     alert was sent, if it does not already exist.
     """
+    global _alert_state_schema_ready
+    if _alert_state_schema_ready:
+        return
+
     with sqlite3.connect(SETTINGS_DB_PATH) as conn:
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS email_alert_state (
                 id INTEGER PRIMARY KEY CHECK (id = 1),
-                last_sent_at TEXT
+                last_sent_at INTEGER
             )
             """
         )
+        _migrate_text_last_sent(conn)
         conn.commit()
+    _alert_state_schema_ready = True
 
 
-def _get_last_alert_time() -> Optional[dt.datetime]:
+def _migrate_text_last_sent(conn: sqlite3.Connection) -> None:
+    """
+    Older settings.db files store last_sent_at as ISO-8601 UTC text.
+    Rebuild the one-row table with unix seconds.
+    """
+    cols = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(email_alert_state)")}
+    if cols.get("last_sent_at", "").upper() != "TEXT":
+        return
+
+    # One transaction: on any error the old table is left as it was.
+    # A timestamp SQLite cannot parse becomes 0, i.e. the cooldown is over.
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            """
+            CREATE TABLE email_alert_state_new (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                last_sent_at INTEGER
+            )
+            """
+        )
+        conn.execute(
+            """
+            INSERT INTO email_alert_state_new (id, last_sent_at)
+                SELECT id, COALESCE(CAST(strftime('%s', last_sent_at) AS INTEGER), 0)
+                FROM email_alert_state
+            """
+        )
+        conn.execute("DROP TABLE email_alert_state")
+        conn.execute("ALTER TABLE email_alert_state_new RENAME TO email_alert_state")
+
+
+def _get_last_alert_time() -> Optional[int]:
+    """Unix seconds of the last alert email, or None if none was sent."""
     _ensure_alert_state_table()
     with sqlite3.connect(SETTINGS_DB_PATH) as conn:
         cur = conn.execute(
             "SELECT last_sent_at FROM email_alert_state WHERE id = 1"
         )
         row = cur.fetchone()
-        if not row or not row[0]:
-            return None
-        try:
-            return dt.datetime.fromisoformat(row[0])
-        except ValueError:
+        if not row or row[0] is None:
             return None
+        return int(row[0])
 
 
-def _set_last_alert_time(ts: dt.datetime) -> None:
+def _set_last_alert_time(ts: int) -> None:
     _ensure_alert_state_table()
-    iso = ts.isoformat()
     with sqlite3.connect(SETTINGS_DB_PATH) as conn:
-        cur = conn.execute(
-            "SELECT 1 FROM email_alert_state WHERE id = 1"
+        conn.execute(
+            """
+            INSERT INTO email_alert_state (id, last_sent_at) VALUES (1, ?)
+            ON CONFLICT(id) DO UPDATE SET last_sent_at = excluded.last_sent_at
+            """,
+            (ts,),
         )
-        if cur.fetchone():
-            conn.execute(
-                "UPDATE email_alert_state SET last_sent_at = ? WHERE id = 1",
-                (iso,),
-            )
-        else:
-            conn.execute(
-                "INSERT INTO email_alert_state (id, last_sent_at) VALUES (1, ?)",
-                (iso,),
-            )
         conn.commit()
 
 
@@ -324,17 +392,19 @@ def handle_new_reading_for_dashboard(
         return False
 
     cooldown_minutes = _get_cooldown_minutes_from_settings(default_minutes=30)
-    now = dt.datetime.utcnow()
+    now = int(time.time())
     last_sent = _get_last_alert_time()
 
     if last_sent is not None:
-        elapsed_minutes = (now - last_sent).total_seconds() / 60.0
+        elapsed_minutes = (now - last_sent) / 60.0
         if elapsed_minutes < cooldown_minutes:
             # Still within cooldown, do not send another email
             return False
 
+    # One walk over history feeds both the baseline and the AQI trend
     current = history[-1].values
-    baseline = _compute_baseline(history)
+    mat = _history_matrix(history)
+    baseline = _baseline_from_matrix(mat) if len(history) >= 2 else None
 
     spiking = detect_spiking_sensors(
         current_values=current,
@@ -346,9 +416,9 @@ def handle_new_reading_for_dashboard(
     if not spiking:
         return False
 
-    aqi_trend = compute_aqi_trend(
-        history,
-        default_window_minutes=cooldown_minutes,
+    aqi_trend = (
+        _trend_from_matrix(history, mat, cooldown_minutes)
+        if len(history) >= 2 else None
     )
 
     sent = send_spike_alert_if_enabled(
@@ -1,153 +1,203 @@
 # resources/store.py
+import atexit
+import logging
+import operator
+import queue
 import sqlite3
+import threading
 import time
 from pathlib import Path
 from typing import Optional
-import io
+
+
+logger = logging.getLogger(__name__)
 
 BASE_DIR = Path(__file__).resolve().parent
 SENSOR_DB_PATH = BASE_DIR / "sensor.db"
 
 
+# journal_mode is stored in the DB file, so it is switched once per process
+_wal_ready = False
+
+
 def _connect() -> sqlite3.Connection:
+    global _wal_ready
     SENSOR_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
     conn = sqlite3.connect(str(SENSOR_DB_PATH), timeout=5.0)
     conn.row_factory = sqlite3.Row
+    if not _wal_ready:
+        # WAL lets the dashboard read while the sampler writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        _wal_ready = True
+    # Safe with WAL: only the last commits can be lost on power cut,
+    # the file itself stays consistent. Saves an fsync per commit.
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-4000")
+    conn.execute("PRAGMA busy_timeout=5000")
     return conn
 
 
-def ensure_tables() -> None:
-    """
-    Create tables for each sensor if they do not exist.
+# Long-lived write connections, one per thread (the sampler loop, the
+# snapshot writer, Flask worker threads), so an insert is a single
+# statement on a warm connection instead of open + pragmas + close.
+_TLS = threading.local()
+_tables_ready = False
+_dashboard_ready = False
 
-    We do not touch any old tables that might already be in the database.
+
+def get_conn() -> sqlite3.Connection:
+    """This thread's cached sensor.db connection. Do not close it."""
+    conn = getattr(_TLS, "conn", None)
+    if conn is None:
+        conn = _TLS.conn = _connect()
+    return conn
+
+
+def checkpoint() -> None:
     """
-    conn = _connect()
-    cur = conn.cursor()
+    Fold the WAL back into the DB file without waiting on readers, so
+    the WAL stays small and no single commit pays for a big auto
+    checkpoint.
+    """
+    get_conn().execute("PRAGMA wal_checkpoint(PASSIVE)")
 
-    # DHT11: temperature and humidity
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS dht11_readings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ts INTEGER NOT NULL,
-            temperature_c REAL,
-            humidity_percent REAL
-        )
-        """
-    )
 
-    # MQ2: gas sensor on ADS1115 A1
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS mq2_readings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ts INTEGER NOT NULL,
-            raw INTEGER,
-            voltage REAL
-        )
-        """
-    )
+def _require_tables() -> None:
+    """Create the schema on first use; afterwards a flag check only."""
+    if not _tables_ready:
+        ensure_tables()
+    if not _dashboard_ready:
+        ensure_dashboard_table()
 
-    # MQ135: air quality sensor on ADS1115 A0
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS mq135_readings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ts INTEGER NOT NULL,
-            raw INTEGER,
-            voltage REAL
-        )
-        """
-    )
 
-    # DSM501A: dust sensor on GPIO24
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS dsm501a_readings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ts INTEGER NOT NULL,
-            low_pulse_ms REAL,
-            ratio REAL,
-            concentration_ug_m3 REAL
-        )
-        """
-    )
+# Sensor tables and their ts indexes, created by ensure_tables() in one
+# executescript() call and one transaction.
+SENSOR_SCHEMA_SQL = """
+BEGIN;
 
-    conn.commit()
-    conn.close()
+-- DHT11: temperature and humidity
+CREATE TABLE IF NOT EXISTS dht11_readings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts INTEGER NOT NULL,
+    temperature_c REAL,
+    humidity_percent REAL
+);
+
+-- MQ2: gas sensor on ADS1115 A1
+CREATE TABLE IF NOT EXISTS mq2_readings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts INTEGER NOT NULL,
+    raw INTEGER,
+    voltage REAL
+);
+
+-- MQ135: air quality sensor on ADS1115 A0
+CREATE TABLE IF NOT EXISTS mq135_readings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts INTEGER NOT NULL,
+    raw INTEGER,
+    voltage REAL
+);
+
+-- DSM501A: dust sensor on GPIO24
+CREATE TABLE IF NOT EXISTS dsm501a_readings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts INTEGER NOT NULL,
+    low_pulse_ms REAL,
+    ratio REAL,
+    concentration_ug_m3 REAL
+);
+
+-- All reads filter and order by ts, so index it on every table.
+CREATE INDEX IF NOT EXISTS idx_dht11_readings_ts ON dht11_readings(ts);
+CREATE INDEX IF NOT EXISTS idx_mq2_readings_ts ON mq2_readings(ts);
+CREATE INDEX IF NOT EXISTS idx_mq135_readings_ts ON mq135_readings(ts);
+CREATE INDEX IF NOT EXISTS idx_dsm501a_readings_ts ON dsm501a_readings(ts);
+
+COMMIT;
+"""
+
+
+def ensure_tables() -> None:
+    """
+    Create tables for each sensor if they do not exist.
+
+    We do not touch any old tables that might already be in the database.
+    """
+    global _tables_ready
+    conn = _connect()
+    try:
+        conn.executescript(SENSOR_SCHEMA_SQL)
+    finally:
+        conn.close()
+    _tables_ready = True
 
 
 def insert_dht11(
     temperature_c: Optional[float],
     humidity_percent: Optional[float],
     ts: Optional[int] = None,
+    conn: Optional[sqlite3.Connection] = None,
 ) -> None:
-    ensure_tables()
+    _require_tables()
     if ts is None:
         ts = int(time.time())
 
-    conn = _connect()
-    try:
-        cur = conn.cursor()
-        cur.execute(
+    if conn is None:
+        conn = get_conn()
+    with conn:
+        conn.execute(
             """
             INSERT INTO dht11_readings (ts, temperature_c, humidity_percent)
             VALUES (?, ?, ?)
             """,
             (ts, temperature_c, humidity_percent),
         )
-        conn.commit()
-    finally:
-        conn.close()
 
 
 def insert_mq2(
     raw: Optional[int],
     voltage: Optional[float],
     ts: Optional[int] = None,
+    conn: Optional[sqlite3.Connection] = None,
 ) -> None:
-    ensure_tables()
+    _require_tables()
     if ts is None:
         ts = int(time.time())
 
-    conn = _connect()
-    try:
-        cur = conn.cursor()
-        cur.execute(
+    if conn is None:
+        conn = get_conn()
+    with conn:
+        conn.execute(
             """
             INSERT INTO mq2_readings (ts, raw, voltage)
             VALUES (?, ?, ?)
             """,
             (ts, raw, voltage),
         )
-        conn.commit()
-    finally:
-        conn.close()
 
 
 def insert_mq135(
     raw: Optional[int],
     voltage: Optional[float],
     ts: Optional[int] = None,
+    conn: Optional[sqlite3.Connection] = None,
 ) -> None:
-    ensure_tables()
+    _require_tables()
     if ts is None:
         ts = int(time.time())
 
-    conn = _connect()
-    try:
-        cur = conn.cursor()
-        cur.execute(
+    if conn is None:
+        conn = get_conn()
+    with conn:
+        conn.execute(
             """
             INSERT INTO mq135_readings (ts, raw, voltage)
             VALUES (?, ?, ?)
             """,
             (ts, raw, voltage),
         )
-        conn.commit()
-    finally:
-        conn.close()
 
 
 def insert_dsm501a(
@@ -155,29 +205,28 @@ def insert_dsm501a(
     ratio: Optional[float],
     concentration_ug_m3: Optional[float],
     ts: Optional[int] = None,
+    conn: Optional[sqlite3.Connection] = None,
 ) -> None:
-    ensure_tables()
+    _require_tables()
     if ts is None:
         ts = int(time.time())
 
-    conn = _connect()
-    try:
-        cur = conn.cursor()
-        cur.execute(
+    if conn is None:
+        conn = get_conn()
+    with conn:
+        conn.execute(
             """
             INSERT INTO dsm501a_readings (ts, low_pulse_ms, ratio, concentration_ug_m3)
             VALUES (?, ?, ?, ?)
             """,
             (ts, low_pulse_ms, ratio, concentration_ug_m3),
         )
-        conn.commit()
-    finally:
-        conn.close()
 
 def ensure_dashboard_table() -> None:
     """
     Create the combined dashboard_readings table if it does not exist.
     """
+    global _dashboard_ready
     conn = _connect()
     cur = conn.cursor()
 
@@ -198,9 +247,54 @@ def ensure_dashboard_table() -> None:
         )
         """
     )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_dashboard_readings_ts ON dashboard_readings(ts)"
+    )
 
     conn.commit()
     conn.close()
+    _dashboard_ready = True
+
+# dashboard_readings insert and the metrics keys feeding its columns
+# after ts, in column order
+DASHBOARD_INSERT_SQL = """
+    INSERT INTO dashboard_readings (
+        ts,
+        aqi,
+        pm25,
+        pm10,
+        temp,
+        humidity,
+        toxic,
+        flammable,
+        smoke,
+        voc
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+DASHBOARD_METRIC_KEYS = (
+    "aqi",
+    "pm2_5_ug_m3",
+    "pm10_ug_m3",
+    "temperature_c",
+    "humidity_percent",
+    "toxic_index",
+    "flammable_index",
+    "smoke_index",
+    "voc_index",
+)
+
+
+_get_dashboard_metrics = operator.itemgetter(*DASHBOARD_METRIC_KEYS)
+
+
+def _metrics_to_row(metrics: dict, ts: int) -> tuple:
+    try:
+        # compute_live_metrics() always fills every key, one C call then
+        return (ts, *_get_dashboard_metrics(metrics))
+    except KeyError:
+        return (ts, *map(metrics.get, DASHBOARD_METRIC_KEYS))
+
 
 def insert_dashboard_reading(metrics: dict, ts: Optional[int] = None) -> None:
     """
@@ -209,47 +303,220 @@ def insert_dashboard_reading(metrics: dict, ts: Optional[int] = None) -> None:
     metrics is the dict returned by live_aqi.compute_live_metrics()
     or equivalent. If ts is not given, current unix time is used.
     """
+    _require_tables()
     if ts is None:
         ts = int(time.time())
 
     try:
-        conn = _connect()
-        cur = conn.cursor()
-
-        cur.execute(
-            """
-            INSERT INTO dashboard_readings (
-                ts,
-                aqi,
-                pm25,
-                pm10,
-                temp,
-                humidity,
-                toxic,
-                flammable,
-                smoke,
-                voc
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                ts,
-                metrics.get("aqi"),
-                metrics.get("pm2_5_ug_m3"),
-                metrics.get("pm10_ug_m3"),
-                metrics.get("temperature_c"),
-                metrics.get("humidity_percent"),
-                metrics.get("toxic_index"),
-                metrics.get("flammable_index"),
-                metrics.get("smoke_index"),
-                metrics.get("voc_index"),
-            ),
-        )
-        conn.commit()
+        insert_dashboard_readings_many([_metrics_to_row(metrics, ts)])
     except Exception as e:
         print("Error inserting into dashboard_readings:", e)
-    finally:
+
+
+def insert_dashboard_readings_many(rows: list) -> None:
+    """
+    Insert many dashboard rows in one transaction, e.g. for backfills.
+
+    rows are (ts, aqi, pm25, pm10, temp, humidity, toxic, flammable,
+    smoke, voc) tuples, see _metrics_to_row().
+    """
+    conn = get_conn()
+    with conn:
+        conn.executemany(DASHBOARD_INSERT_SQL, rows)
+
+
+def _row_ts(data: dict, default: int) -> int:
+    ts = data.get("ts")
+    return default if ts is None else ts
+
+
+# INSERT statements for one snapshot, in the order _snapshot_rows()
+# returns their parameter rows.
+SNAPSHOT_SQL = (
+    """
+    INSERT INTO dht11_readings (ts, temperature_c, humidity_percent)
+    VALUES (?, ?, ?)
+    """,
+    """
+    INSERT INTO mq2_readings (ts, raw, voltage)
+    VALUES (?, ?, ?)
+    """,
+    """
+    INSERT INTO mq135_readings (ts, raw, voltage)
+    VALUES (?, ?, ?)
+    """,
+    """
+    INSERT INTO dsm501a_readings (ts, low_pulse_ms, ratio, concentration_ug_m3)
+    VALUES (?, ?, ?, ?)
+    """,
+    DASHBOARD_INSERT_SQL,
+)
+
+
+def _snapshot_rows(
+    dht: dict,
+    mq2_r: dict,
+    mq135_r: dict,
+    dsm: dict,
+    metrics: Optional[dict],
+    now: int,
+) -> tuple:
+    """Parameter rows for SNAPSHOT_SQL; the dashboard row is None without metrics."""
+    dashboard = None
+    if metrics is not None:
+        dashboard = _metrics_to_row(metrics, _row_ts(metrics, now))
+
+    return (
+        (_row_ts(dht, now), dht.get("temperature_c"), dht.get("humidity_percent")),
+        (_row_ts(mq2_r, now), mq2_r.get("raw"), mq2_r.get("voltage")),
+        (_row_ts(mq135_r, now), mq135_r.get("raw"), mq135_r.get("voltage")),
+        (
+            _row_ts(dsm, now),
+            dsm.get("low_pulse_ms"),
+            dsm.get("ratio"),
+            dsm.get("concentration_ug_m3"),
+        ),
+        dashboard,
+    )
+
+
+def _write_snapshots(snapshots: list) -> None:
+    """Insert a batch of _snapshot_rows() results in one transaction."""
+    conn = get_conn()
+    with conn:
+        # take the write lock up front instead of upgrading mid-transaction
+        conn.execute("BEGIN IMMEDIATE")
+        for idx, sql in enumerate(SNAPSHOT_SQL):
+            rows = [snap[idx] for snap in snapshots if snap[idx] is not None]
+            if rows:
+                conn.executemany(sql, rows)
+
+
+def insert_snapshot(
+    dht: dict,
+    mq2_r: dict,
+    mq135_r: dict,
+    dsm: dict,
+    metrics: Optional[dict] = None,
+) -> None:
+    """
+    Insert one reading per sensor, plus the combined dashboard row when
+    metrics is given, in a single transaction.
+
+    dht, mq2_r, mq135_r and dsm are the dicts returned by the sensor
+    read() functions. Rows without a ts use the current unix time.
+    """
+    _require_tables()
+    now = int(time.time())
+
+    _write_snapshots([_snapshot_rows(dht, mq2_r, mq135_r, dsm, metrics, now)])
+
+
+# ---------- Background snapshot writer ----------
+#
+# enqueue_snapshot() hands the rows to a daemon thread, so a request does
+# not wait on sqlite. The thread commits up to WRITE_BATCH_ROWS snapshots
+# per transaction, or whatever arrived within WRITE_BATCH_SEC. A batch
+# that hits a transient sqlite error (e.g. "database is locked" while
+# sampler.py writes) is retried with backoff before it is given up.
+
+WRITE_BATCH_ROWS = 100
+WRITE_BATCH_SEC = 1.0
+WRITE_RETRIES = 5
+WRITE_RETRY_BASE_SEC = 0.5
+_WRITE_Q: "queue.Queue[tuple]" = queue.Queue(maxsize=10_000)
+_writer_lock = threading.Lock()
+writer_thread: Optional[threading.Thread] = None
+
+
+def _writer_loop() -> None:
+    _require_tables()
+    while True:
+        batch = [_WRITE_Q.get()]
+        deadline = time.monotonic() + WRITE_BATCH_SEC
+        while len(batch) < WRITE_BATCH_ROWS:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_WRITE_Q.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        try:
+            _write_batch(batch)
+        finally:
+            for _ in batch:
+                _WRITE_Q.task_done()
+
+
+def _write_batch(batch: list) -> None:
+    """
+    Commit one writer batch. OperationalError (locked / busy DB) is retried
+    with exponential backoff; the transaction is all-or-nothing, so a retry
+    never duplicates rows.
+    """
+    delay = WRITE_RETRY_BASE_SEC
+    for attempt in range(1, WRITE_RETRIES + 1):
         try:
-            conn.close()
-        except Exception:
-            pass
+            _write_snapshots(batch)
+            return
+        except sqlite3.OperationalError as e:
+            if attempt == WRITE_RETRIES:
+                logger.error(
+                    "store writer: dropped %d snapshots after %d attempts: %s",
+                    len(batch), attempt, e,
+                )
+                return
+            logger.warning(
+                "store writer: write of %d snapshots failed (%s), retrying in %.1fs",
+                len(batch), e, delay,
+            )
+            time.sleep(delay)
+            delay *= 2
+        except sqlite3.Error:
+            logger.exception("store writer: dropped %d snapshots", len(batch))
+            return
+
+
+def _start_writer() -> None:
+    global writer_thread
+    with _writer_lock:
+        if writer_thread is None or not writer_thread.is_alive():
+            writer_thread = threading.Thread(
+                target=_writer_loop, name="store-writer", daemon=True
+            )
+            writer_thread.start()
+
+
+def enqueue_snapshot(
+    dht: dict,
+    mq2_r: dict,
+    mq135_r: dict,
+    dsm: dict,
+    metrics: Optional[dict] = None,
+) -> None:
+    """
+    Same rows as insert_snapshot(), written by the background thread.
+
+    Timestamps are taken now, not at write time. If the queue is full the
+    snapshot is written synchronously instead of being dropped.
+    """
+    now = int(time.time())
+    rows = _snapshot_rows(dht, mq2_r, mq135_r, dsm, metrics, now)
+
+    _start_writer()
+    try:
+        _WRITE_Q.put_nowait(rows)
+    except queue.Full:
+        _require_tables()
+        _write_snapshots([rows])
+
+
+def flush_writes() -> None:
+    """Block until every queued snapshot has been committed."""
+    if writer_thread is not None and writer_thread.is_alive():
+        _WRITE_Q.join()
+
+
+atexit.register(flush_writes)
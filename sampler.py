@@ -5,11 +5,13 @@ from sensors import dht11, mq2, mq135, dsm501a
 from resources import store
 
 SAMPLE_INTERVAL = 5  # seconds
+CHECKPOINT_EVERY = 60  # samples, i.e. every 5 min
 
 
 def main():
     print("Starting continuous sensor loop (every 5 sec)...")
     store.ensure_tables()
+    cycles = 0
 
     while True:
         ts = int(time.time())
@@ -23,40 +25,16 @@ def main():
         dsm = dsm501a.read()
 
         # -------------------------
-        # Store each reading individually
+        # Store all four readings in one transaction
         # -------------------------
-
-        # DHT11
-        store.insert_dht11(
-            temperature_c=dht.get("temperature_c"),
-            humidity_percent=dht.get("humidity_percent"),
-            ts=dht.get("ts"),
-        )
-
-        # MQ2
-        store.insert_mq2(
-            raw=mq2_r.get("raw"),
-            voltage=mq2_r.get("voltage"),
-            ts=mq2_r.get("ts"),
-        )
-
-        # MQ135
-        store.insert_mq135(
-            raw=mq135_r.get("raw"),
-            voltage=mq135_r.get("voltage"),
-            ts=mq135_r.get("ts"),
-        )
-
-        # DSM501A
-        store.insert_dsm501a(
-            low_pulse_ms=dsm.get("low_pulse_ms"),
-            ratio=dsm.get("ratio"),
-            concentration_ug_m3=dsm.get("concentration_ug_m3"),
-            ts=dsm.get("ts"),
-        )
+        store.insert_snapshot(dht, mq2_r, mq135_r, dsm)
 
         print(f"[{ts}] Stored new sensor readings.")
 
+        cycles += 1
+        if cycles % CHECKPOINT_EVERY == 0:
+            store.checkpoint()
+
         time.sleep(SAMPLE_INTERVAL)
 
 
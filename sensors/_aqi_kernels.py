@@ -0,0 +1,92 @@
+# sensors/_aqi_kernels.py
+"""
+Numeric kernels behind live_aqi.
+
+Compiled with numba when it is installed; without it the same functions
+run as plain Python/NumPy. None handling stays in live_aqi, the kernels
+only ever see floats, and return plain Python floats/ints either way.
+
+Called on their own, small helpers like scaled_index cost more in numba
+call overhead than they save; live_metrics fuses the whole per-poll math
+so that overhead is paid once.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional, the kernels then run as plain Python
+    def njit(*args, **kwargs):
+        def wrap(fn):
+            return fn
+        return wrap
+
+
+@njit(cache=True, fastmath=True)
+def scaled_index(value, good_level, bad_level):
+    """Map value in [good_level, bad_level] to [0, 500], clamped at both ends."""
+    if value <= good_level:
+        return 0.0
+    if value >= bad_level:
+        return 500.0
+    return float(500.0 * (value - good_level) / (bad_level - good_level))
+
+
+@njit(cache=True, fastmath=True)
+def aqi_from_pm(value, table):
+    """
+    Convert μg/m3 to AQI with an (n, 4) breakpoint table of
+    (c_low, c_high, i_low, i_high) rows sorted by c_high.
+    """
+    if value <= table[0, 0]:
+        return 0.0
+    idx = np.searchsorted(table[:, 1], value)
+    if idx >= table.shape[0]:
+        # Above highest breakpoint, clamp to 500
+        return 500.0
+    c_low = table[idx, 0]
+    c_high = table[idx, 1]
+    i_low = table[idx, 2]
+    i_high = table[idx, 3]
+    return float(i_low + (i_high - i_low) * (value - c_low) / (c_high - c_low))
+
+
+@njit(cache=True, fastmath=True)
+def live_metrics(pm_raw, mq2_v, mq135_v, pm25_factor, pm10_factor,
+                 pm25_table, pm10_table, status_breaks, gas_levels):
+    """
+    All live AQI math for one poll.
+
+    pm25_factor and pm10_factor take the raw DSM501A reading straight to
+    calibrated PM2.5 and approximated PM10.
+
+    gas_levels rows are (good, bad) for voc, toxic, smoke, flammable; the
+    first two apply to mq135_v, the last two to mq2_v. A missing PM reading
+    is passed as 0.0, which gives the same zero AQIs.
+
+    Returns (pm2_5, pm10, voc, toxic, smoke, flammable,
+             pm25_aqi, pm10_aqi, aqi, status_idx).
+    """
+    pm2_5 = pm_raw * pm25_factor
+    pm10 = pm_raw * pm10_factor
+
+    voc = scaled_index(mq135_v, gas_levels[0, 0], gas_levels[0, 1])
+    toxic = scaled_index(mq135_v, gas_levels[1, 0], gas_levels[1, 1])
+    smoke = scaled_index(mq2_v, gas_levels[2, 0], gas_levels[2, 1])
+    flammable = scaled_index(mq2_v, gas_levels[3, 0], gas_levels[3, 1])
+
+    pm25_aqi = aqi_from_pm(pm2_5, pm25_table)
+    pm10_aqi = aqi_from_pm(pm10, pm10_table)
+    aqi = max(pm25_aqi, pm10_aqi)
+    status_idx = int(np.searchsorted(status_breaks, aqi))
+
+    return (pm2_5, pm10, voc, toxic, smoke, flammable,
+            pm25_aqi, pm10_aqi, aqi, status_idx)
+
+
+# Compile (or load from cache) at import so the first live read does not pay for it
+_table = np.array([[0.0, 12.0, 0.0, 50.0]])
+aqi_from_pm(10.0, _table)
+live_metrics(10.0, 1.0, 1.0, 0.5, 1.2, _table, _table,
+             np.array([50.0]), np.array([[0.3, 2.5]] * 4))
+del _table
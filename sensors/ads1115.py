@@ -1,4 +1,6 @@
 # sensors/ads1115.py
+import threading
+
 import board
 import busio
 import adafruit_ads1x15.ads1115 as ADS
@@ -16,7 +18,30 @@ CHANNEL_MAP = {
 }
 
 
+# One AnalogIn per channel, built once instead of on every read
+CHANNELS = {ch: AnalogIn(ads, pin) for ch, pin in CHANNEL_MAP.items()}
+
+
+# Full-scale volts per gain setting, as in the Adafruit driver. AnalogIn.voltage
+# re-reads .value, so voltage is derived here to keep one conversion per read.
+PGA_RANGE = {2 / 3: 6.144, 1: 4.096, 2: 2.048, 4: 1.024, 8: 0.512, 16: 0.256}
+
+# The ADC has one mux shared by all channels; reads from different threads
+# must not interleave.
+_bus_lock = threading.Lock()
+
+
+def _read(ch):
+    raw = int(CHANNELS[ch].value)
+    return raw, raw * PGA_RANGE[ads.gain] / 32767
+
+
 def read_channel(ch):
-    pin = CHANNEL_MAP[ch]
-    chan = AnalogIn(ads, pin)
-    return int(chan.value), float(chan.voltage)
+    with _bus_lock:
+        return _read(ch)
+
+
+def read_channels(chs):
+    """Read several channels back to back under one lock: {ch: (raw, voltage)}."""
+    with _bus_lock:
+        return {ch: _read(ch) for ch in chs}
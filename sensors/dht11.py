@@ -1,9 +1,22 @@
 # sensors/dht11.py
+import threading
 import time
 import random
 
 DHT_PIN = 25
 
+# The DHT11 is polled by a background thread, so read() returns the last
+# good value at once instead of blocking the caller through retries.
+POLL_INTERVAL_SEC = 2.0   # the sensor needs >1 s between reads
+MAX_AGE_SEC = 30          # older values count as missing
+FIRST_READ_TIMEOUT_SEC = 2.5
+
+_latest = None  # (temperature_c, humidity_percent, ts)
+_latest_lock = threading.Lock()
+_first_value = threading.Event()  # set by the first value, or once the first wait timed out
+_reader = None  # None: not started, False: no sensor available
+_reader_lock = threading.Lock()
+
 
 def _simulate():
     return (
@@ -12,28 +25,62 @@ def _simulate():
     )
 
 
-def read():
+def _open_sensor():
     try:
         import adafruit_dht
         import board
 
-        sensor = adafruit_dht.DHT11(board.D25, use_pulseio=False)
-
-        for _ in range(5):
-            try:
-                t = sensor.temperature
-                h = sensor.humidity
-                if t is not None and h is not None:
-                    return {
-                        "temperature_c": float(t),
-                        "humidity_percent": float(h),
-                        "ts": int(time.time())
-                    }
-            except Exception:
-                time.sleep(0.5)
-
+        return adafruit_dht.DHT11(board.D25, use_pulseio=False)
     except Exception:
-        pass
+        return None
+
+
+def _reader_loop(sensor):
+    global _latest
+    while True:
+        try:
+            t = sensor.temperature
+            h = sensor.humidity
+            if t is not None and h is not None:
+                with _latest_lock:
+                    _latest = (float(t), float(h), int(time.time()))
+                _first_value.set()
+        except Exception:
+            pass  # DHT11 reads fail often, try again next round
+        time.sleep(POLL_INTERVAL_SEC)
+
+
+def _start_reader() -> bool:
+    global _reader
+    with _reader_lock:
+        if _reader is None:
+            sensor = _open_sensor()
+            if sensor is None:
+                _reader = False
+            else:
+                _reader = threading.Thread(
+                    target=_reader_loop, args=(sensor,), name="dht11-reader", daemon=True
+                )
+                _reader.start()
+    return _reader is not False
+
+
+def read():
+    if _start_reader():
+        # Only the first call waits for the reader's first value. If none
+        # arrives in time (e.g. sensor unplugged), stop waiting from then on.
+        if not _first_value.wait(FIRST_READ_TIMEOUT_SEC):
+            _first_value.set()
+
+        with _latest_lock:
+            latest = _latest
+        if latest is not None and time.time() - latest[2] <= MAX_AGE_SEC:
+            t, h, ts = latest
+            return {
+                "temperature_c": t,
+                "humidity_percent": h,
+                "ts": ts
+            }
 
     t, h = _simulate()
     return {
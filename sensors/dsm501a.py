@@ -1,4 +1,5 @@
 # sensors/dsm501a.py
+import threading
 import time
 import RPi.GPIO as GPIO
 
@@ -7,6 +8,16 @@ DEFAULT_SAMPLE_SEC = 5
 
 _initialized = False
 
+# Low-pulse time is accumulated by an edge callback run from RPi.GPIO's
+# own thread, so read() can sleep through the sample window instead of
+# polling the pin. If edge detection is unavailable read() polls.
+_edge_detect = None  # None: not tried yet
+_edge_lock = threading.Lock()
+_read_lock = threading.Lock()
+_low_time = 0.0
+_last_state = None
+_last_change = 0.0
+
 def _ensure_setup():
     global _initialized
     if not _initialized:
@@ -16,30 +27,89 @@ def _ensure_setup():
         _initialized = True
 
 
-def read(sample_sec: int = None):
-    _ensure_setup()
+def _on_edge(channel):
+    global _low_time, _last_state, _last_change
+    now = time.perf_counter()
+    s = GPIO.input(channel)
+    with _edge_lock:
+        if s != _last_state:
+            if _last_state == GPIO.LOW:
+                _low_time += now - _last_change
+            _last_state = s
+            _last_change = now
+
+
+def _ensure_edge_detect() -> bool:
+    global _edge_detect
+    if _edge_detect is None:
+        try:
+            GPIO.add_event_detect(DSM_PIN, GPIO.BOTH, callback=_on_edge)
+            _edge_detect = True
+        except RuntimeError as e:
+            print("dsm501a: edge detection unavailable, polling instead:", e)
+            _edge_detect = False
+    return _edge_detect
+
+
+def _sample_low_time_edges(sample_sec: float) -> float:
+    """Low-pulse seconds over sample_sec, counted by _on_edge."""
+    global _low_time, _last_state, _last_change
+    with _read_lock:
+        with _edge_lock:
+            _low_time = 0.0
+            _last_state = GPIO.input(DSM_PIN)
+            _last_change = time.perf_counter()
+
+        time.sleep(sample_sec)
+
+        with _edge_lock:
+            low_time = _low_time
+            if _last_state == GPIO.LOW:
+                low_time += time.perf_counter() - _last_change
+    return low_time
 
-    # use custom sample time or fall back to default
-    SAMPLE_SEC = sample_sec if sample_sec is not None else DEFAULT_SAMPLE_SEC
 
-    start = time.time()
+def _sample_low_time_polling(sample_sec: float) -> float:
+    """Low-pulse seconds over sample_sec, polling the pin."""
+    # locals skip the module attribute lookups inside the tight loop
+    gi = GPIO.input
+    pc = time.perf_counter
+    low = GPIO.LOW
+
+    start = pc()
     low_time = 0
-    last_state = GPIO.input(DSM_PIN)
+    last_state = gi(DSM_PIN)
     last_change = start
 
-    end = start + SAMPLE_SEC
+    end = start + sample_sec
 
-    while time.time() < end:
-        s = GPIO.input(DSM_PIN)
-        now = time.time()
+    while True:
+        now = pc()
+        if now >= end:
+            break
+        s = gi(DSM_PIN)
         if s != last_state:
-            if last_state == GPIO.LOW:
+            if last_state == low:
                 low_time += now - last_change
             last_state = s
             last_change = now
 
-    if last_state == GPIO.LOW:
-        low_time += time.time() - last_change
+    if last_state == low:
+        low_time += pc() - last_change
+
+    return low_time
+
+
+def read(sample_sec: int = None):
+    _ensure_setup()
+
+    # use custom sample time or fall back to default
+    SAMPLE_SEC = sample_sec if sample_sec is not None else DEFAULT_SAMPLE_SEC
+
+    if _ensure_edge_detect():
+        low_time = _sample_low_time_edges(SAMPLE_SEC)
+    else:
+        low_time = _sample_low_time_polling(SAMPLE_SEC)
 
     lpo_ms = low_time * 1000
     ratio = lpo_ms / (SAMPLE_SEC * 1000 * 10)
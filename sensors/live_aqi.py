@@ -10,33 +10,42 @@ This module is for instant AQI based on:
 Predictive or forecasted AQI will live in ai/aqi.py later.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any
+import os
 import time
 
-from . import dht11, dsm501a, mq2, mq135
+import numpy as np
+
+from . import ads1115, dht11, dsm501a, mq2, mq135
+from . import _aqi_kernels as _kernels
 from resources import settings as settings_store
 
 # sensors/live_aqi.py
 
 INDOOR_PM_CALIBRATION = 0.5  # try 0.5 first, then tune
 
-# -------- Helpers --------
+# Very simple approximation: PM10 a bit higher than PM2.5.
+PM10_FROM_PM25 = 1.2
 
-def _scaled_index(value: float, good_level: float, bad_level: float) -> float:
-    """
-    Map a sensor value in [good_level, bad_level] to an index in [0, 500].
+# Raw DSM501A reading -> calibrated PM2.5 / approximated PM10, one multiply each
+_PM25_FACTOR = INDOOR_PM_CALIBRATION
+_PM10_FACTOR = INDOOR_PM_CALIBRATION * PM10_FROM_PM25
 
-    Below good_level -> 0
-    Above bad_level  -> 500
-    """
-    if value is None:
-        return 0.0
-    if value <= good_level:
-        return 0.0
-    if value >= bad_level:
-        return 500.0
-    return 500.0 * (value - good_level) / (bad_level - good_level)
+# (good_level, bad_level) for the gas indices, in the order voc, toxic
+# (MQ135) and smoke, flammable (MQ2). Thresholds are rough and should be
+# tuned with real world data.
+GAS_LEVELS = np.array([
+    [0.3, 2.5],
+    [0.6, 3.0],
+    [0.3, 2.5],
+    [0.5, 3.0],
+])
+
+# Set AQI_DEBUG=1 to always attach the raw sensor readings to live metrics
+AQI_DEBUG = bool(os.environ.get("AQI_DEBUG"))
 
+# -------- AQI tables --------
 
 # US style AQI breakpoints for particles
 PM25_BREAKPOINTS = [
@@ -67,32 +76,59 @@ PM10_BREAKPOINTS = [
     (425.0, 604.0, 301, 500),
 ]
 
-INDOOR_PM10_BREAKPOINTS = [
-    (0.0,   24.0,   0,   50),
-    (24.1,  70.8,  51,  100),
-    (70.9, 110.8, 101,  150),
-    (110.9,300.8, 151, 200),
-    (300.9,500.8, 201, 300),
-    (500.9,1000.8,301, 500),
-]
+# Indoor PM10 uses the same bands as indoor PM2.5; share the one table.
+INDOOR_PM10_BREAKPOINTS = INDOOR_PM25_BREAKPOINTS
+
+# The same tables as (n, 4) arrays, built once; column 1 (c_high) is
+# sorted, so the band is found with one binary search.
+PM25_TABLE = np.array(PM25_BREAKPOINTS, dtype=np.float64)
+INDOOR_PM25_TABLE = np.array(INDOOR_PM25_BREAKPOINTS, dtype=np.float64)
+PM10_TABLE = np.array(PM10_BREAKPOINTS, dtype=np.float64)
+INDOOR_PM10_TABLE = INDOOR_PM25_TABLE
+
 
-def _aqi_from_pm(value: float, breakpoints) -> float:
-    """Convert μg/m3 to AQI using the given breakpoint table."""
-    if value is None:
-        return 0.0
-    for c_low, c_high, i_low, i_high in breakpoints:
-        if c_low <= value <= c_high:
-            return i_low + (i_high - i_low) * (value - c_low) / (c_high - c_low)
-    # Above highest breakpoint, clamp to 500
-    return 500.0
+# Upper AQI bound (inclusive) of each status; anything above the last
+# bound falls through to "Hazardous".
+_STATUS_BREAKS = np.array([50, 100, 150, 200, 300], dtype=float)
+_STATUS = (
+    "Good",
+    "Moderate",
+    "Unhealthy for sensitive groups",
+    "Unhealthy",
+    "Very Unhealthy",
+    "Hazardous",
+)
+
+
+# -------- Settings --------
+
+def _get_refresh_rate() -> int:
+    """
+    refresh_rate from settings, min 1 s. get_latest_settings() is already
+    cached and invalidated on save, so this reads through it every time.
+    """
+    settings = settings_store.get_latest_settings()
+    refresh_rate = 1  # fallback
+    if settings and settings.get("refresh_rate"):
+        refresh_rate = max(1, int(settings["refresh_rate"]))
+    return refresh_rate
 
 
 # -------- Main live computation --------
 
-def compute_live_metrics() -> Dict[str, Any]:
+# DSM501A blocks for the whole sample window and DHT11 may wait for its
+# first reading, so they run here while the caller reads the ADS1115.
+# MQ2 and MQ135 share one ADC on one I2C bus and are read in one locked scan.
+_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="live-read")
+
+
+def compute_live_metrics(include_raw: bool = False) -> Dict[str, Any]:
     """
     Read all physical sensors and compute live AQI.
 
+    The per-sensor readings are only attached under "raw" when include_raw
+    is set (or AQI_DEBUG is on).
+
     Returns:
         {
           "ts": int,   # seconds
@@ -108,21 +144,23 @@ def compute_live_metrics() -> Dict[str, Any]:
           "pm10_aqi": float,
           "aqi": float,
           "status": str,
-          "raw": { ... }
+          "raw": { ... }   # only with include_raw
         }
     """
-    # Raw sensor reads
-    dht = dht11.read()
-    mq2_r = mq2.read()
-    mq135_r = mq135.read()
-    settings = settings_store.get_latest_settings()
-    refresh_rate = 1  # fallback
-    if settings and settings.get("refresh_rate"):
-        refresh_rate = max(1, int(settings["refresh_rate"]))
-
-    dsm = dsm501a.read(sample_sec=refresh_rate)
+    refresh_rate = _get_refresh_rate()
 
+    # Raw sensor reads
+    dsm_f = _POOL.submit(dsm501a.read, sample_sec=refresh_rate)
+    dht_f = _POOL.submit(dht11.read)
+    adc = ads1115.read_channels((mq2.CHANNEL, mq135.CHANNEL))
+    dht = dht_f.result()
+    dsm = dsm_f.result()
+
+    # One timestamp for the whole poll; DHT11 and DSM501A keep their own
+    # since they say when that value was actually sampled
     ts_now = int(time.time())
+    mq2_r = mq2.reading(*adc[mq2.CHANNEL], ts=ts_now)
+    mq135_r = mq135.reading(*adc[mq135.CHANNEL], ts=ts_now)
 
     # Temperature and humidity
     temp = dht.get("temperature_c")
@@ -131,48 +169,36 @@ def compute_live_metrics() -> Dict[str, Any]:
         # DSM501A concentration_ug_m3 is used as PM2.5 approximation.
     pm2_5_raw = dsm.get("concentration_ug_m3")
 
-    if pm2_5_raw is None:
-        pm2_5 = None
-        pm10 = None
-    else:
-        # Apply simple indoor calibration
-        pm2_5 = pm2_5_raw * INDOOR_PM_CALIBRATION
+    # MQ2 and MQ135 voltages
+    mq2_v = mq2_r.get("voltage")
+    mq135_v = mq135_r.get("voltage")
+    mq2_v = 0.0 if mq2_v is None else float(mq2_v)
+    mq135_v = 0.0 if mq135_v is None else float(mq135_v)
 
-        # Very simple approximation: PM10 a bit higher than PM2.5.
-        pm10 = pm2_5 * 1.2
+    result = _metrics(ts_now, temp, humid, pm2_5_raw, mq2_v, mq135_v)
 
+    if include_raw or AQI_DEBUG:
+        result["raw"] = {
+            "dht11": dht,
+            "mq2": mq2_r,
+            "mq135": mq135_r,
+            "dsm501a": dsm,
+        }
+    return result
 
-    # MQ2 and MQ135 voltages
-    mq2_voltage = mq2_r.get("voltage")
-    mq135_voltage = mq135_r.get("voltage")
-
-    # Gas indices (for separate display, not for main AQI)
-    # Thresholds are rough and should be tuned with real world data.
-    voc_index = _scaled_index(mq135_voltage or 0.0, good_level=0.3, bad_level=2.5)
-    toxic_index = _scaled_index(mq135_voltage or 0.0, good_level=0.6, bad_level=3.0)
-    smoke_index = _scaled_index(mq2_voltage or 0.0, good_level=0.3, bad_level=2.5)
-    flammable_index = _scaled_index(mq2_voltage or 0.0, good_level=0.5, bad_level=3.0)
-
-    # Particle AQIs
-    pm25_aqi = _aqi_from_pm(pm2_5, INDOOR_PM25_BREAKPOINTS)
-    pm10_aqi = _aqi_from_pm(pm10 or 0.0, INDOOR_PM10_BREAKPOINTS)
-
-    # Combined AQI for live display - PM only
-    combined_aqi = max(pm25_aqi, pm10_aqi)
-    
-    # Human readable status
-    if combined_aqi <= 50:
-        status = "Good"
-    elif combined_aqi <= 100:
-        status = "Moderate"
-    elif combined_aqi <= 150:
-        status = "Unhealthy for sensitive groups"
-    elif combined_aqi <= 200:
-        status = "Unhealthy"
-    elif combined_aqi <= 300:
-        status = "Very Unhealthy"
-    else:
-        status = "Hazardous"
+
+def _metrics(ts_now, temp, humid, pm2_5_raw, mq2_v, mq135_v) -> Dict[str, Any]:
+    """AQI, indices and status for one set of live inputs."""
+    (pm2_5, pm10, voc_index, toxic_index, smoke_index, flammable_index,
+     pm25_aqi, pm10_aqi, combined_aqi, status_idx) = _kernels.live_metrics(
+        0.0 if pm2_5_raw is None else float(pm2_5_raw), mq2_v, mq135_v,
+        _PM25_FACTOR, _PM10_FACTOR,
+        INDOOR_PM25_TABLE, INDOOR_PM10_TABLE, _STATUS_BREAKS, GAS_LEVELS,
+    )
+    if pm2_5_raw is None:
+        pm2_5 = None
+        pm10 = None
+    status = _STATUS[status_idx]
 
     return {
         "ts": ts_now,
@@ -200,14 +226,6 @@ def compute_live_metrics() -> Dict[str, Any]:
         # Combined AQI and status (PM only)
         "aqi": combined_aqi,
         "status": status,
-
-        # Raw readings for debugging
-        "raw": {
-            "dht11": dht,
-            "mq2": mq2_r,
-            "mq135": mq135_r,
-            "dsm501a": dsm,
-        },
     }
 
 
@@ -5,9 +5,13 @@ from .ads1115 import read_channel
 CHANNEL = 1
 
 def read():
-    raw, voltage = read_channel(CHANNEL)
+    return reading(*read_channel(CHANNEL))
+
+
+def reading(raw, voltage, ts=None):
+    """Reading dict for a (raw, voltage) pair already taken from the ADC."""
     return {
         "raw": raw,
         "voltage": voltage,
-        "ts": int(time.time())
+        "ts": int(time.time()) if ts is None else ts
     }
@@ -23,11 +23,12 @@ aqi_trend = {
     "predicted_peak": 210,
 }
 
-sent = send_spike_alert_if_enabled(
-    spiking_sensors=spiking_sensors,
-    metrics=metrics,
-    aqi_trend=aqi_trend,
-    forecast_window_minutes=30,
-)
+if __name__ == "__main__":
+    sent = send_spike_alert_if_enabled(
+        spiking_sensors=spiking_sensors,
+        metrics=metrics,
+        aqi_trend=aqi_trend,
+        forecast_window_minutes=30,
+    )
 
-print("Email sent?", sent)
+    print("Email sent?", sent)
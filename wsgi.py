@@ -0,0 +1,6 @@
+# wsgi.py
+# Entry point for a production WSGI server:
+#   gunicorn -k gthread -w 2 --threads 8 -b 0.0.0.0:5000 wsgi:app
+from index import create_app
+
+app = create_app()